@@ -1,9 +1,58 @@
 import pandas as pd
+import numpy as np
 import hashlib
+from bisect import bisect_right
 from datetime import datetime
 
-def anonymize_data(df, rules):
-    """Applique les règles d'anonymisation sur le dataframe"""
+# tranches produites par les règles de généralisation (catégories ordonnées communes à tous les runs)
+BAND_DTYPES = {
+    'tranche_age': pd.CategoricalDtype(
+        ["< 30 ans", "30-40 ans", "40-50 ans", "50-60 ans", "60-70 ans", "70-80 ans", "80+ ans", "Inconnu"], ordered=True),
+    'tranche_revenu': pd.CategoricalDtype(
+        ["< 20k", "20k-30k", "30k-40k", "40k-50k", "50k-60k", "60k-80k", "80k-100k", "100k+", "Inconnu"], ordered=True),
+    'tranche_pension': pd.CategoricalDtype(
+        ["< 1000€", "1000-1500€", "1500-2000€", "2000-2500€", "2500-3000€", "3000€+", "Inconnu"], ordered=True),
+}
+# bornes supérieures (exclues) des tranches, dans l'ordre des catégories ci-dessus (hors "Inconnu")
+BAND_BOUNDS = {
+    'tranche_age': [30, 40, 50, 60, 70, 80],
+    'tranche_revenu': [20000, 30000, 40000, 50000, 60000, 80000, 100000],
+    'tranche_pension': [1000, 1500, 2000, 2500, 3000],
+}
+_BAND_LABELS = {col: list(dtype.categories[:-1]) for col, dtype in BAND_DTYPES.items()}
+
+# libellés des règles (métadonnées d'export), communs aux moteurs de calcul
+RULE_LABELS = {
+    'hash_identifiants': "Identifiants → Hash SHA256",
+    'supprimer_noms': "Nom/Prénom → Supprimés",
+    'tranches_age': "Date naissance → Tranche d'âge",
+    'postal_to_dept': "Code postal → Département",
+    'supprimer_commune': "Commune → Supprimée",
+    'tranches_revenus': "Revenu → Tranches",
+    'tranches_pension': "Pension → Tranches",
+}
+
+# microagrégation : montants remplacés par la moyenne de groupes d'au moins k assurés proches
+MICROAGG_COLUMNS = ['revenu_annuel_brut', 'montant_pension_mensuelle']
+MICROAGG_K = 5
+MICROAGG_RULE = "Montants → Microagrégation MDAV (k={k})"
+# taille des feuilles de la partition spatiale dans lesquelles on applique MDAV
+MDAV_LEAF_SIZE = 128
+
+def anonymize_data(df, rules, pseudonymize=None, backend="pandas"):
+    """
+    Applique les règles d'anonymisation sur le dataframe.
+    pseudonymize(series) remplace le hachage ligne à ligne des identifiants (ex: coffre de pseudonymes).
+    backend="polars" applique les mêmes règles en un seul plan lazy (voir backends.py).
+    """
+    
+    if backend != "pandas":
+        if pseudonymize is not None:
+            raise ValueError("Le coffre de pseudonymes n'est disponible qu'avec le moteur pandas")
+        # import différé : backends importe ce module
+        from backends import check_backend, polars_anonymize
+        check_backend(backend)
+        return polars_anonymize(df, rules)
     
     df_anon = df.copy()
     applied_rules = []
@@ -11,67 +60,212 @@ def anonymize_data(df, rules):
     # règle 1: hash SHA256 pour les identifiants directs
     if rules.get('hash_identifiants', True):
         if 'id_assure' in df_anon.columns:
-            df_anon['id_assure'] = df_anon['id_assure'].apply(lambda x: hashlib.sha256(str(x).encode()).hexdigest()[:16])
-            applied_rules.append("Identifiants → Hash SHA256")
+            if pseudonymize is not None:
+                df_anon['id_assure'] = pseudonymize(df_anon['id_assure'])
+            else:
+                df_anon['id_assure'] = df_anon['id_assure'].apply(hash_identifier)
+            applied_rules.append(RULE_LABELS['hash_identifiants'])
     
     # règle 2: suppression nom/prénom
     if rules.get('supprimer_noms', True):
         for col in ['nom', 'prenom']:
             if col in df_anon.columns:
                 df_anon = df_anon.drop(columns=[col])
-        applied_rules.append("Nom/Prénom → Supprimés")
+        applied_rules.append(RULE_LABELS['supprimer_noms'])
     
     # règle 3: date de naissance → tranche d'âge
     if rules.get('tranches_age', True) and 'date_naissance' in df_anon.columns:
-        df_anon['tranche_age'] = df_anon['date_naissance'].apply(date_to_age_range)
+        df_anon['tranche_age'] = df_anon['date_naissance'].apply(date_to_age_range).astype(BAND_DTYPES['tranche_age'])
         df_anon = df_anon.drop(columns=['date_naissance'])
-        applied_rules.append("Date naissance → Tranche d'âge")
+        applied_rules.append(RULE_LABELS['tranches_age'])
     
     # règle 4: code postal → département
     if rules.get('postal_to_dept', True) and 'code_postal' in df_anon.columns:
         df_anon['departement'] = df_anon['code_postal'].apply(lambda x: str(x)[:2] if pd.notna(x) else None)
         df_anon = df_anon.drop(columns=['code_postal'])
-        applied_rules.append("Code postal → Département")
+        applied_rules.append(RULE_LABELS['postal_to_dept'])
     
     # règle 5: suppression commune
     if rules.get('supprimer_commune', True) and 'commune' in df_anon.columns:
         df_anon = df_anon.drop(columns=['commune'])
-        applied_rules.append("Commune → Supprimée")
+        applied_rules.append(RULE_LABELS['supprimer_commune'])
+    
+    # règle 6: revenus → microagrégation (prioritaire) ou tranches
+    if rules.get('microagregation'):
+        df_anon = microaggregate(df_anon, rules['microagregation'])
+        applied_rules.append(MICROAGG_RULE.format(k=rules['microagregation']))
     
-    # règle 6: revenus → tranches
-    if rules.get('tranches_revenus', True):
+    elif rules.get('tranches_revenus', True):
         if 'revenu_annuel_brut' in df_anon.columns:
-            df_anon['tranche_revenu'] = df_anon['revenu_annuel_brut'].apply(revenu_to_range)
+            df_anon['tranche_revenu'] = df_anon['revenu_annuel_brut'].apply(revenu_to_range).astype(BAND_DTYPES['tranche_revenu'])
             df_anon = df_anon.drop(columns=['revenu_annuel_brut'])
-            applied_rules.append("Revenu → Tranches")
+            applied_rules.append(RULE_LABELS['tranches_revenus'])
         
         if 'montant_pension_mensuelle' in df_anon.columns:
-            df_anon['tranche_pension'] = df_anon['montant_pension_mensuelle'].apply(pension_to_range)
+            df_anon['tranche_pension'] = df_anon['montant_pension_mensuelle'].apply(pension_to_range).astype(BAND_DTYPES['tranche_pension'])
             df_anon = df_anon.drop(columns=['montant_pension_mensuelle'])
-            applied_rules.append("Pension → Tranches")
+            applied_rules.append(RULE_LABELS['tranches_pension'])
     
     return df_anon, applied_rules
 
+def rewritten_columns(rules):
+    """Colonnes recalculées par les règles (identifiant haché, département) : leur type d'origine ne s'applique plus"""
+    columns = set()
+    if rules.get('hash_identifiants', True):
+        columns.add('id_assure')
+    if rules.get('postal_to_dept', True):
+        columns.add('departement')
+    return columns
+
+def apply_global_rules(df, rules):
+    """
+    Applique en amont les règles qui portent sur tout le jeu (microagrégation), avant un
+    traitement par blocs. Retourne (df, règles restantes pour les blocs, règles appliquées).
+    """
+    k = rules.get('microagregation')
+    if not k:
+        return df, rules, []
+    
+    remaining = {**rules, 'microagregation': None, 'tranches_revenus': False}
+    return microaggregate(df, k), remaining, [MICROAGG_RULE.format(k=k)]
+
+def microaggregate(df, k=MICROAGG_K, columns=MICROAGG_COLUMNS):
+    """
+    Microagrégation MDAV des colonnes numériques : chaque groupe d'au moins k lignes proches
+    est remplacé par son centroïde (les valeurs manquantes restent manquantes).
+    Un ensemble de moins de k lignes (ex: les rares lignes où manque l'autre montant) ne peut
+    pas former de groupe : ses valeurs sont masquées plutôt que publiées.
+    """
+    cols = [c for c in columns if c in df.columns]
+    if not cols:
+        return df
+    
+    values = df[cols].to_numpy(dtype=float)
+    result = np.full_like(values, np.nan)
+    
+    # lignes complètes : agrégation multivariée
+    complete = ~np.isnan(values).any(axis=1)
+    result[complete] = _microaggregate_block(values[complete], k)
+    
+    # lignes incomplètes : agrégation colonne par colonne sur les valeurs présentes
+    for j in range(len(cols)):
+        partial = ~complete & ~np.isnan(values[:, j])
+        result[partial, j] = _microaggregate_block(values[partial, j:j + 1], k)[:, 0]
+    
+    return df.assign(**{col: np.round(result[:, j], 2) for j, col in enumerate(cols)})
+
+def _microaggregate_block(values, k):
+    if len(values) < k:
+        # centroïde de moins de k lignes : il révélerait les valeurs d'origine
+        return np.full_like(values, np.nan)
+    
+    # distances calculées sur les colonnes centrées réduites (revenu annuel et pension mensuelle comparables)
+    std = values.std(axis=0)
+    std[std == 0] = 1
+    labels = mdav_groups((values - values.mean(axis=0)) / std, k)
+    
+    sizes = np.bincount(labels)
+    centroids = np.stack([np.bincount(labels, weights=values[:, j]) / sizes for j in range(values.shape[1])], axis=1)
+    return centroids[labels]
+
+def mdav_groups(points, k, leaf_size=MDAV_LEAF_SIZE):
+    """
+    Numéro de groupe MDAV de chaque point (groupes d'au moins k points, sauf si n < k).
+    Les points sont d'abord répartis en feuilles par coupes médianes successives (kd-tree),
+    puis MDAV exact est appliqué dans toutes les feuilles à la fois : O(n log n) au lieu de O(n²).
+    """
+    leaf_size = max(leaf_size, k)
+    leaves = []
+    
+    stack = [np.arange(len(points))]
+    while stack:
+        idx = stack.pop()
+        if len(idx) >= 2 * leaf_size:
+            # coupe médiane sur la dimension la plus étendue : deux moitiés d'au moins leaf_size points
+            leaf_points = points[idx]
+            dim = np.argmax(leaf_points.max(axis=0) - leaf_points.min(axis=0))
+            half = len(idx) // 2
+            order = np.argpartition(leaf_points[:, dim], half)
+            stack += [idx[order[:half]], idx[order[half:]]]
+        elif len(idx):
+            leaves.append(idx)
+    
+    if not leaves:
+        return np.empty(0, dtype=np.int64)
+    
+    # feuilles empilées dans un tableau (feuille, position) complété par des points invalides
+    width = max(len(leaf) for leaf in leaves)
+    rows = np.zeros((len(leaves), width), dtype=np.int64)
+    valid = np.zeros((len(leaves), width), dtype=bool)
+    for i, leaf in enumerate(leaves):
+        rows[i, :len(leaf)] = leaf
+        valid[i, :len(leaf)] = True
+    
+    group_of = _mdav(points[rows], valid, k)
+    labels = np.empty(len(points), dtype=np.int64)
+    labels[rows[valid]] = np.unique((np.arange(len(leaves))[:, None] * width + group_of)[valid], return_inverse=True)[1]
+    return labels
+
+def _mdav(points, valid, k):
+    """
+    MDAV exact, vectorisé sur un lot de feuilles : points (feuilles, positions, dimensions),
+    valid masque les positions de remplissage. Retourne le numéro de groupe dans la feuille.
+    """
+    n_leaves, width, _ = points.shape
+    group_of = np.full((n_leaves, width), -1, dtype=np.int64)
+    free = valid.copy()
+    n_groups = np.zeros(n_leaves, dtype=np.int64)
+    
+    def take_nearest(leaves, dist):
+        # les k points libres les plus proches forment un nouveau groupe de la feuille
+        dist = np.where(free[leaves], dist, np.inf)
+        nearest = np.argpartition(dist, k - 1, axis=1)[:, :k]
+        group_of[leaves[:, None], nearest] = n_groups[leaves, None]
+        free[leaves[:, None], nearest] = False
+        n_groups[leaves] += 1
+    
+    def farthest(leaves, dist):
+        return np.argmax(np.where(free[leaves], dist, -np.inf), axis=1)
+    
+    def sq_dist(leaves, ref):
+        pts = points[leaves]
+        return sum((pts[:, :, j] - ref[:, j, None]) ** 2 for j in range(pts.shape[2]))
+    
+    def centroid(leaves):
+        mask = free[leaves][:, :, None]
+        return (points[leaves] * mask).sum(axis=1) / mask.sum(axis=1)
+    
+    while True:
+        count = free.sum(axis=1)
+        leaves = np.flatnonzero(count >= 3 * k)
+        if not len(leaves):
+            break
+        # r : point le plus éloigné du centroïde, s : point le plus éloigné de r
+        r = farthest(leaves, sq_dist(leaves, centroid(leaves)))
+        dist_r = sq_dist(leaves, points[leaves, r])
+        take_nearest(leaves, dist_r)
+        s = farthest(leaves, dist_r)
+        take_nearest(leaves, sq_dist(leaves, points[leaves, s]))
+    
+    leaves = np.flatnonzero(free.sum(axis=1) >= 2 * k)
+    if len(leaves):
+        r = farthest(leaves, sq_dist(leaves, centroid(leaves)))
+        take_nearest(leaves, sq_dist(leaves, points[leaves, r]))
+    
+    # le reste de chaque feuille (moins de 2k points) forme un dernier groupe
+    group_of[free] = np.broadcast_to(n_groups[:, None], free.shape)[free]
+    return group_of
+
+def hash_identifier(value):
+    """Pseudonyme SHA256 (16 caractères) d'un identifiant"""
+    return hashlib.sha256(str(value).encode()).hexdigest()[:16]
+
 def date_to_age_range(date_str):
     """Convertit une date de naissance en tranche d'âge"""
     try:
         birth_date = pd.to_datetime(date_str)
         age = (datetime.now() - birth_date).days // 365
-        
-        if age < 30:
-            return "< 30 ans"
-        elif age < 40:
-            return "30-40 ans"
-        elif age < 50:
-            return "40-50 ans"
-        elif age < 60:
-            return "50-60 ans"
-        elif age < 70:
-            return "60-70 ans"
-        elif age < 80:
-            return "70-80 ans"
-        else:
-            return "80+ ans"
+        return band_label('tranche_age', age)
     except:
         return "Inconnu"
 
@@ -79,49 +273,27 @@ def revenu_to_range(revenu):
     """Convertit un revenu en tranche"""
     if pd.isna(revenu):
         return "Inconnu"
-    
-    if revenu < 20000:
-        return "< 20k"
-    elif revenu < 30000:
-        return "20k-30k"
-    elif revenu < 40000:
-        return "30k-40k"
-    elif revenu < 50000:
-        return "40k-50k"
-    elif revenu < 60000:
-        return "50k-60k"
-    elif revenu < 80000:
-        return "60k-80k"
-    elif revenu < 100000:
-        return "80k-100k"
-    else:
-        return "100k+"
+    return band_label('tranche_revenu', revenu)
 
 def pension_to_range(pension):
     """Convertit une pension en tranche"""
     if pd.isna(pension):
         return "Inconnu"
-    
-    if pension < 1000:
-        return "< 1000€"
-    elif pension < 1500:
-        return "1000-1500€"
-    elif pension < 2000:
-        return "1500-2000€"
-    elif pension < 2500:
-        return "2000-2500€"
-    elif pension < 3000:
-        return "2500-3000€"
-    else:
-        return "3000€+"
-
-def create_metadata_header(applied_rules, k_anonymity_final):
-    """Crée un header de métadonnées pour le CSV exporté"""
+    return band_label('tranche_pension', pension)
+
+def band_label(column, value):
+    """Libellé de la tranche contenant la valeur (première borne supérieure strictement plus grande)"""
+    return _BAND_LABELS[column][bisect_right(BAND_BOUNDS[column], value)]
+
+def create_metadata_header(applied_rules, k_anonymity_final, warnings=None):
+    """Crée un header de métadonnées pour le CSV exporté (warnings : alertes à signaler au destinataire)"""
     
     metadata = f"""# RGPD Data Qualification Platform - Export
 # Date d'export: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 # Règles appliquées: {', '.join(applied_rules)}
 # k-anonymat final moyen: {k_anonymity_final:.1f}
-#
 """
+    for warning in warnings or []:
+        metadata += f"# ATTENTION: {warning}\n"
+    metadata += "#\n"
     return metadata
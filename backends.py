@@ -0,0 +1,177 @@
+import os
+from datetime import datetime
+from importlib.util import find_spec
+
+import numpy as np
+import pandas as pd
+
+from anonymizer import BAND_BOUNDS, BAND_DTYPES, RULE_LABELS, apply_global_rules, hash_identifier
+
+# moteurs de calcul : pandas (eager) ou Polars (plan de requête lazy, optimisé et multithreadé)
+BACKENDS = ['pandas', 'polars']
+DEFAULT_BACKEND = os.getenv("RETRAISHIELD_BACKEND", "pandas")
+
+_MICROSECONDS_PER_DAY = 86_400_000_000
+
+
+def available_backends():
+    """Liste les moteurs disponibles (Polars uniquement si le module est installé)"""
+    return [b for b in BACKENDS if b == 'pandas' or find_spec(b) is not None]
+
+
+def check_backend(backend):
+    if backend not in available_backends():
+        raise ValueError(f"Moteur de calcul non disponible : {backend}")
+
+
+def polars_equivalence_classes(df, quasi_identifiers, derive=False):
+    """
+    equivalence_classes exécuté par Polars : projection, dérivation des QI (année, département),
+    comptage par groupe et tri forment un seul plan. Même table (valeurs, types, ordre) que pandas.
+    """
+    import polars as pl
+
+    qi = list(quasi_identifiers)
+    derived = {}
+    if derive and 'annee_naissance' in qi:
+        derived['annee_naissance'] = _birth_datetime(pl, df, strict=True).dt.year()
+    if derive and 'departement' in qi and 'departement' not in df.columns:
+        derived['departement'] = pl.col('code_postal').cast(pl.String).str.slice(0, 2)
+    if not qi:
+        return pd.DataFrame({'k': [len(df)]} if len(df) else {'k': []})
+
+    sources = [c for c in df.columns if (c in qi and c not in derived)
+               or (c == 'date_naissance' and 'annee_naissance' in derived)
+               or (c == 'code_postal' and 'departement' in derived)]
+    plan = pl.from_pandas(df[sources]).lazy().with_columns(**derived).group_by(qi).agg(k=pl.len())
+
+    # ordre de pandas : clés triées (catégories dans l'ordre de leurs modalités, manquants en dernier), puis k
+    order = []
+    for col in qi:
+        if col in df.columns and col not in derived and isinstance(df[col].dtype, pd.CategoricalDtype):
+            categories = [str(c) for c in df[col].cat.categories]
+            order.append(pl.col(col).cast(pl.String).replace_strict(categories, range(len(categories)), default=None))
+        else:
+            order.append(pl.col(col))
+    classes = (plan.sort([pl.col('k'), *order], nulls_last=True)
+               .with_columns(pl.col('k').cast(pl.Int64))
+               .collect().to_pandas())
+    return _restore_dtypes(classes, df, exclude=derived)
+
+
+def polars_anonymize(df, rules):
+    """
+    anonymize_data exécuté par Polars : hachage, tranches, département et suppressions forment
+    un seul plan lazy, qui ne lit que les colonnes conservées ou utiles aux règles.
+    La microagrégation (qui porte sur tout le jeu) est faite avant, par le moteur pandas.
+    """
+    import polars as pl
+
+    df, rules, global_rules = apply_global_rules(df, rules)
+    applied_rules = []
+    rewritten = set()
+
+    # colonnes supprimées : jamais converties ni lues
+    dropped = set()
+    if rules.get('supprimer_noms', True):
+        dropped |= {'nom', 'prenom'}
+    if rules.get('supprimer_commune', True):
+        dropped.add('commune')
+    plan = pl.from_pandas(df[[c for c in df.columns if c not in dropped]]).lazy()
+
+    # règle 1: hash SHA256 des identifiants (pas d'équivalent natif : appliqué par lot dans le plan)
+    if rules.get('hash_identifiants', True) and 'id_assure' in df.columns:
+        plan = plan.with_columns(pl.col('id_assure').map_batches(_hash_batch, return_dtype=pl.String))
+        rewritten.add('id_assure')
+        applied_rules.append(RULE_LABELS['hash_identifiants'])
+
+    # règle 2: nom/prénom (déjà écartés de la projection)
+    if rules.get('supprimer_noms', True):
+        applied_rules.append(RULE_LABELS['supprimer_noms'])
+
+    # règle 3: date de naissance → tranche d'âge (âge en jours entiers // 365, comme date_to_age_range)
+    if rules.get('tranches_age', True) and 'date_naissance' in df.columns:
+        age = (pl.lit(datetime.now()) - _birth_datetime(pl, df, strict=False)).dt.total_microseconds()
+        age = age // _MICROSECONDS_PER_DAY // 365
+        plan = plan.with_columns(_band(pl, age, 'tranche_age', source=pl.col('date_naissance'))).drop('date_naissance')
+        applied_rules.append(RULE_LABELS['tranches_age'])
+
+    # règle 4: code postal → département
+    if rules.get('postal_to_dept', True) and 'code_postal' in df.columns:
+        plan = plan.with_columns(departement=pl.col('code_postal').cast(pl.String).str.slice(0, 2)).drop('code_postal')
+        rewritten.add('departement')
+        applied_rules.append(RULE_LABELS['postal_to_dept'])
+
+    # règle 5: commune (déjà écartée de la projection)
+    if rules.get('supprimer_commune', True) and 'commune' in df.columns:
+        applied_rules.append(RULE_LABELS['supprimer_commune'])
+
+    # règle 6: revenus → tranches (la microagrégation a été appliquée en amont)
+    if rules.get('tranches_revenus', True):
+        for source, band, label in (('revenu_annuel_brut', 'tranche_revenu', 'tranches_revenus'),
+                                    ('montant_pension_mensuelle', 'tranche_pension', 'tranches_pension')):
+            if source in df.columns:
+                plan = plan.with_columns(_band(pl, pl.col(source), band)).drop(source)
+                applied_rules.append(RULE_LABELS[label])
+
+    df_anon = plan.collect().to_pandas()
+    df_anon.index = df.index
+    return _restore_dtypes(df_anon, df, exclude=rewritten), applied_rules + global_rules
+
+
+def _birth_datetime(pl, df, strict):
+    """Expression date de naissance en datetime, quel que soit son type dans le DataFrame (texte ou date)"""
+    col = pl.col('date_naissance')
+    if pd.api.types.is_datetime64_any_dtype(df['date_naissance'].dtype):
+        return col
+    return col.cast(pl.String).str.to_datetime(strict=strict)
+
+
+def _band(pl, value, column, source=None):
+    """
+    Expression tranche (bornes BAND_BOUNDS, "Inconnu" si valeur manquante) au type catégoriel de BAND_DTYPES.
+    `source` : colonne d'où la valeur est calculée ; absente, pandas obtient un NaN classé dans la dernière tranche
+    (toutes les comparaisons sont fausses), seule une valeur illisible donne "Inconnu".
+    """
+    labels = list(BAND_DTYPES[column].categories)
+    bounds = BAND_BOUNDS[column]
+    expr = pl
+    if source is not None:
+        expr = expr.when(source.is_null()).then(pl.lit(labels[len(bounds)]))
+    expr = expr.when(value.is_null()).then(pl.lit("Inconnu"))
+    for bound, label in zip(bounds, labels):
+        expr = expr.when(value < bound).then(pl.lit(label))
+    return expr.otherwise(pl.lit(labels[len(bounds)])).cast(pl.Enum(labels)).alias(column)
+
+
+def _hash_batch(series):
+    import polars as pl
+
+    # valeur manquante hachée comme pandas le fait (str(nan))
+    return pl.Series([hash_identifier("nan" if v is None else v) for v in series.to_list()], dtype=pl.String)
+
+
+def _restore_dtypes(result, df, exclude=()):
+    """Types pandas d'origine (catégories, texte, entiers...) et tranches ordonnées après conversion depuis Polars"""
+    for col in result.columns:
+        if col in BAND_DTYPES:
+            result[col] = result[col].astype(BAND_DTYPES[col])
+        elif col not in df.columns or col in exclude:
+            continue
+        elif isinstance(df[col].dtype, pd.CategoricalDtype) and isinstance(result[col].dtype, pd.CategoricalDtype):
+            result[col] = _recode(result[col], df[col].dtype)
+        elif result[col].dtype != df[col].dtype:
+            result[col] = result[col].astype(df[col].dtype)
+    return result
+
+
+def _recode(series, dtype):
+    """
+    Catégories remises dans l'ordre d'origine. astype ne suffit pas : pandas tient pour égaux deux types
+    catégoriels non ordonnés aux mêmes modalités, et Polars ne conserve les modalités qu'en texte.
+    """
+    positions = pd.Index([str(c) for c in dtype.categories]).get_indexer(series.cat.categories.astype(str))
+    codes = series.cat.codes.to_numpy()
+    return pd.Series(pd.Categorical.from_codes(np.where(codes >= 0, positions[codes], -1), dtype=dtype),
+                     index=series.index, name=series.name)
+
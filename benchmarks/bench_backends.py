@@ -0,0 +1,61 @@
+"""
+Benchmark des moteurs de calcul : pandas contre Polars (plan lazy) sur les classes d'équivalence
+et l'anonymisation. Vérifie au passage que les deux moteurs donnent exactement le même résultat.
+
+Usage :
+    python benchmarks/bench_backends.py --rows 10000000
+    python benchmarks/bench_backends.py --rows 1000000 --qi annee_naissance,departement,sexe,statut
+"""
+import argparse
+import os
+import sys
+import time
+
+from pandas.testing import assert_frame_equal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from anonymizer import anonymize_data  # noqa: E402
+from backends import available_backends  # noqa: E402
+from bench_parallel_anonymize import RULES, synthetic_dataset  # noqa: E402
+from rgpd_analyzer import equivalence_classes  # noqa: E402
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--qi', default='annee_naissance,departement,sexe')
+    args = parser.parse_args()
+
+    backends = available_backends()
+    if 'polars' not in backends:
+        sys.exit("Polars n'est pas installé (pip install polars)")
+
+    print(f"Génération de {args.rows:,} lignes...")
+    df = synthetic_dataset(args.rows)
+    qi = args.qi.split(',')
+
+    tasks = [
+        ("classes d'équivalence", lambda backend: equivalence_classes(df, qi, derive=True, backend=backend)),
+        ("anonymisation", lambda backend: anonymize_data(df, RULES, backend=backend)[0]),
+    ]
+    print(f"{'opération':<24} {'moteur':>8} {'durée (s)':>10} {'lignes/s':>12} {'speedup':>8}")
+    for name, task in tasks:
+        baseline, reference = None, None
+        for backend in backends:
+            result, duration = timed(task, backend)
+            if reference is None:
+                baseline, reference = duration, result
+            else:
+                assert_frame_equal(reference, result)
+            print(f"{name:<24} {backend:>8} {duration:>10.2f} {args.rows / duration:>12,.0f} {baseline / duration:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
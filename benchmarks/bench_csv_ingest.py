@@ -0,0 +1,89 @@
+"""
+Benchmark de lecture CSV : pd.read_csv par défaut contre csv_loader.read_csv (schéma deviné,
+types explicites, moteur pyarrow), avec et sans projection de colonnes.
+Chaque lecture est faite dans un processus neuf pour mesurer son pic mémoire (RSS).
+
+Usage :
+    python benchmarks/bench_csv_ingest.py --rows 10000000
+    python benchmarks/bench_csv_ingest.py --path fichier_partenaire.csv --columns date_naissance,code_postal,sexe
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROBE = """
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+import pandas as pd
+from csv_loader import read_csv
+rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+if {mode!r} == 'pandas':
+    df = pd.read_csv({path!r})
+else:
+    df, _ = read_csv({path!r}, columns={columns!r}, engine={engine!r})
+duration = time.perf_counter() - start
+print(json.dumps({{'seconds': duration, 'rows': len(df), 'columns': df.shape[1],
+                  'frame_bytes': int(df.memory_usage(deep=True).sum()),
+                  'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before}}))
+"""
+
+_GENERATE = """
+import sys
+sys.path.insert(0, {benchmarks!r})
+from bench_parallel_anonymize import synthetic_dataset
+synthetic_dataset({rows}).to_csv({path!r}, index=False)
+"""
+
+
+def probe(path, mode, columns=None, engine=None):
+    code = _PROBE.format(root=ROOT, path=path, mode=mode, columns=columns, engine=engine)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--path', help="CSV existant (sinon un fichier synthétique de --rows lignes est généré)")
+    parser.add_argument('--columns', default='date_naissance,code_postal,sexe,montant_pension_mensuelle',
+                        help="colonnes lues dans la variante projetée")
+    args = parser.parse_args()
+
+    tmp_dir = None
+    path = args.path
+    if path is None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        path = os.path.join(tmp_dir.name, "bench.csv")
+        print(f"Génération de {args.rows:,} lignes...")
+        # dans un processus à part : le pic RSS d'un processus est hérité par les processus qu'il lance
+        subprocess.run([sys.executable, "-c", _GENERATE.format(benchmarks=os.path.dirname(os.path.abspath(__file__)),
+                                                               rows=args.rows, path=path)], check=True)
+
+    size_mb = os.path.getsize(path) / 1024**2
+    print(f"Fichier : {size_mb:,.0f} Mo")
+    columns = args.columns.split(',')
+    runs = [
+        ("pd.read_csv", probe(path, 'pandas')),
+        ("read_csv (moteur C)", probe(path, 'loader', engine='c')),
+        ("read_csv (pyarrow)", probe(path, 'loader', engine='pyarrow')),
+        (f"read_csv ({len(columns)} colonnes)", probe(path, 'loader', columns=columns, engine='pyarrow')),
+    ]
+
+    baseline = runs[0][1]
+    print(f"{'lecture':<26} {'durée (s)':>10} {'Mo/s':>8} {'speedup':>8} {'DataFrame (Mo)':>15} {'pic RSS (Mo)':>13}")
+    for name, r in runs:
+        print(f"{name:<26} {r['seconds']:>10.2f} {size_mb / r['seconds']:>8.0f} {baseline['seconds'] / r['seconds']:>7.1f}x "
+              f"{r['frame_bytes'] / 1024**2:>15,.0f} {r['peak_rss_kb'] / 1024:>13,.0f}")
+
+    if tmp_dir is not None:
+        tmp_dir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark de mise à l'échelle de anonymize_data_parallel.
+
+Usage :
+    python benchmarks/bench_parallel_anonymize.py --rows 10000000 --workers 1,2,4,8,16
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parallel_anonymizer import anonymize_data_parallel  # noqa: E402
+
+RULES = {
+    'hash_identifiants': True, 'supprimer_noms': True,
+    'tranches_age': True, 'postal_to_dept': True,
+    'supprimer_commune': True, 'tranches_revenus': True
+}
+
+
+def synthetic_dataset(n_rows, seed=0):
+    """Dataset au schéma de generate_demo_data, généré en vectoriel (Faker est trop lent à 10M lignes)"""
+    rng = np.random.default_rng(seed)
+    birth = np.datetime64('1935-01-01') + rng.integers(0, 365 * 30, n_rows).astype('timedelta64[D]')
+    revenu = rng.integers(15000, 150000, n_rows)
+    return pd.DataFrame({
+        'id_assure': pd.Series(np.arange(1, n_rows + 1)).map('ASS{:08d}'.format),
+        'nom': rng.choice(['Martin', 'Bernard', 'Thomas', 'Petit', 'Robert'], n_rows),
+        'prenom': rng.choice(['Jean', 'Marie', 'Pierre', 'Anne', 'Louis'], n_rows),
+        'date_naissance': birth.astype(str),
+        'sexe': rng.choice(['M', 'F'], n_rows),
+        'code_postal': pd.Series(rng.integers(1000, 96000, n_rows)).map('{:05d}'.format),
+        'commune': rng.choice(['Paris', 'Lyon', 'Lille', 'Nantes'], n_rows),
+        'revenu_annuel_brut': revenu,
+        'montant_pension_mensuelle': (revenu * rng.uniform(0.4, 0.7, n_rows) / 12).astype(int),
+        'nb_trimestres_valides': rng.integers(100, 180, n_rows),
+        'statut': rng.choice(['Retraité', 'En liquidation', 'Actif cotisant'], n_rows),
+        'secteur_activite': rng.choice(['Public', 'Privé', 'Indépendant', 'Agricole'], n_rows),
+        'type_regime': rng.choice(['AGIRC', 'ARRCO', 'AGIRC-ARRCO'], n_rows),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--workers', default='1,2,4,8,16')
+    parser.add_argument('--partitions-per-worker', type=int, default=2)
+    args = parser.parse_args()
+
+    print(f"Génération de {args.rows:,} lignes...")
+    df = synthetic_dataset(args.rows)
+
+    baseline = None
+    print(f"{'workers':>8} {'partitions':>11} {'durée (s)':>10} {'lignes/s':>12} {'speedup':>8}")
+    for n_workers in (int(w) for w in args.workers.split(',')):
+        n_partitions = n_workers * args.partitions_per_worker
+        # premier appel hors mesure : démarrage des processus du pool
+        anonymize_data_parallel(df.head(n_partitions * 10), RULES, n_workers, n_partitions, min_rows=0)
+
+        start = time.perf_counter()
+        anonymize_data_parallel(df, RULES, n_workers, n_partitions, min_rows=0)
+        duration = time.perf_counter() - start
+
+        baseline = baseline or duration
+        print(f"{n_workers:>8} {n_partitions:>11} {duration:>10.2f} {args.rows / duration:>12,.0f} {baseline / duration:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
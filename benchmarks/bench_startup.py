@@ -0,0 +1,86 @@
+"""
+Benchmark du démarrage à froid de app.py : temps d'import des modules et temps du premier rendu.
+Chaque mesure est faite dans un processus Python neuf. Échoue (code de sortie 1) si un module
+lourd est chargé au démarrage ou si un budget est dépassé.
+
+Usage :
+    python benchmarks/bench_startup.py --runs 5 --max-import-ms 1500 --max-render-ms 4000
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# ne doivent être importés qu'au premier usage (connexion SQL, graphique, jeu de démo, moteur Polars)
+DEFERRED_MODULES = ['psycopg2', 'plotly.express', 'faker', 'polars']
+
+_PROBE = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+{imports}
+import_s = time.perf_counter() - start
+render_s = None
+if {render}:
+    from streamlit.testing.v1 import AppTest
+    start = time.perf_counter()
+    AppTest.from_file({app!r}, default_timeout=120).run()
+    render_s = time.perf_counter() - start
+print(json.dumps({{'import_s': import_s, 'render_s': render_s,
+                  'loaded': [m for m in {deferred!r} if m in sys.modules]}}))
+"""
+
+
+def top_level_imports(path):
+    """Instructions d'import de premier niveau du script (ce qui est exécuté au chargement)"""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def probe(app, render):
+    code = _PROBE.format(root=ROOT, imports=top_level_imports(app), render=render, app=app, deferred=DEFERRED_MODULES)
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--max-import-ms", type=float, default=None)
+    parser.add_argument("--max-render-ms", type=float, default=None)
+    parser.add_argument("--no-render", action="store_true", help="mesure uniquement les imports")
+    args = parser.parse_args()
+
+    app = os.path.join(ROOT, "app.py")
+    results = [probe(app, render=not args.no_render) for _ in range(args.runs)]
+    import_ms = statistics.median(r['import_s'] for r in results) * 1000
+    print(f"imports de app.py      : {import_ms:8.0f} ms (médiane sur {args.runs} processus)")
+
+    failures = []
+    render_ms = None
+    if not args.no_render:
+        render_ms = statistics.median(r['render_s'] for r in results) * 1000
+        print(f"premier rendu          : {render_ms:8.0f} ms")
+
+    loaded = sorted({m for r in results for m in r['loaded']})
+    print(f"modules différés chargés : {', '.join(loaded) or 'aucun'}")
+    if loaded:
+        failures.append(f"modules lourds importés au démarrage : {', '.join(loaded)}")
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        failures.append(f"imports {import_ms:.0f} ms > {args.max_import_ms:.0f} ms")
+    if args.max_render_ms is not None and render_ms is not None and render_ms > args.max_render_ms:
+        failures.append(f"premier rendu {render_ms:.0f} ms > {args.max_render_ms:.0f} ms")
+
+    for failure in failures:
+        print(f"ÉCHEC : {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
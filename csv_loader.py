@@ -0,0 +1,183 @@
+import codecs
+import csv
+import io
+import os
+import time
+from importlib.util import find_spec
+
+import numpy as np
+import pandas as pd
+
+# début du fichier lu pour deviner encodage, séparateur et types
+SAMPLE_BYTES = 1 << 20
+DELIMITERS = ",;\t|"
+# colonnes texte stockées en catégories si peu de valeurs distinctes dans l'échantillon
+CATEGORY_MAX_RATIO = 0.5
+CATEGORY_MAX_VALUES = 10_000
+
+_INT_PATTERN = r"-?\d+"
+_FLOAT_PATTERN = r"-?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+_DATE_PATTERN = r"\d{4}-\d{2}-\d{2}"
+# codes à conserver en texte (codes postaux, NIR...) : un zéro en tête serait perdu en entier
+_LEADING_ZERO_PATTERN = r"-?0\d"
+
+# types du moteur C de pandas ; les entiers sont lus en int64 puis réduits en int32 si possible
+_PANDAS_DTYPES = {'int': 'int64', 'float': 'float64', 'category': 'category', 'text': 'str'}
+_INT32 = np.iinfo(np.int32)
+
+
+def csv_engine():
+    """Moteur de lecture : pyarrow (multithreadé) s'il est installé, sinon le moteur C de pandas"""
+    return "pyarrow" if find_spec("pyarrow") else "c"
+
+
+def sniff_csv(source, sample_bytes=SAMPLE_BYTES):
+    """
+    Devine encodage, séparateur et type de chaque colonne sur le début du fichier.
+    Retourne un dict (encoding, delimiter, columns, kinds) ; kinds associe à chaque colonne
+    'int', 'float', 'date', 'category' ou 'text'.
+    """
+    raw = _read_head(source, sample_bytes)
+    if len(raw) >= sample_bytes:
+        # dernière ligne de l'échantillon probablement tronquée
+        raw = raw[:raw.rfind(b"\n") + 1] or raw
+
+    encoding = _sniff_encoding(raw)
+    text = raw.decode(encoding)
+    try:
+        head = "\n".join(text.splitlines()[:50])
+        delimiter = csv.Sniffer().sniff(head, delimiters=DELIMITERS).delimiter
+    except csv.Error:
+        delimiter = ","
+
+    sample = pd.read_csv(io.StringIO(text), sep=delimiter, dtype=str)
+    return {
+        'encoding': encoding,
+        'delimiter': delimiter,
+        'columns': list(sample.columns),
+        'kinds': {col: _column_kind(sample[col]) for col in sample.columns},
+    }
+
+
+def read_csv(source, columns=None, schema=None, engine=None):
+    """
+    Lit un CSV avec les types devinés par sniff_csv, en ne gardant que `columns` (toutes par défaut).
+    Retourne (DataFrame, rapport de lecture : lignes, octets, secondes, Mo/s, moteur, encodage, séparateur).
+    """
+    schema = schema or sniff_csv(source)
+    engine = engine or csv_engine()
+    # ordre des colonnes du fichier, quel que soit l'ordre demandé
+    columns = [c for c in schema['columns'] if columns is None or c in columns]
+    kinds = {c: schema['kinds'][c] for c in columns}
+    options = {'sep': schema['delimiter'], 'encoding': schema['encoding'], 'usecols': columns}
+
+    start = time.perf_counter()
+    try:
+        if engine == "pyarrow":
+            df = _read_arrow(source, schema, columns, kinds)
+        else:
+            df = pd.read_csv(_rewind(source), dtype={c: _PANDAS_DTYPES[k] for c, k in kinds.items() if k in _PANDAS_DTYPES},
+                             parse_dates=[c for c, k in kinds.items() if k == 'date'], engine="c", **options)
+    except ValueError:
+        # type démenti plus loin dans le fichier (texte dans une colonne numérique...) :
+        # relecture par le moteur C, textes conservés tels quels, nombres et dates laissés à l'inférence
+        engine = "c"
+        df = pd.read_csv(_rewind(source), dtype={c: 'str' for c, k in kinds.items() if k in ('category', 'text')},
+                         engine=engine, **options)
+
+    for col in columns:
+        series = df[col]
+        if kinds[col] == 'category' and not isinstance(series.dtype, pd.CategoricalDtype):
+            df[col] = series.astype("category")
+        elif pd.api.types.is_integer_dtype(series.dtype) and series.dtype != np.int32 and len(series) \
+                and _INT32.min <= series.min() and series.max() <= _INT32.max:
+            df[col] = series.astype(np.int32)
+    seconds = time.perf_counter() - start
+
+    size = _source_size(source)
+    report = {
+        'rows': len(df), 'columns': len(columns), 'bytes': size, 'seconds': seconds,
+        'mb_per_s': size / 1024**2 / seconds if seconds > 0 else None,
+        'engine': engine, 'encoding': schema['encoding'], 'delimiter': schema['delimiter'],
+    }
+    return df, report
+
+
+def _read_arrow(source, schema, columns, kinds):
+    """Lecture multithreadée par pyarrow, types appliqués pendant l'analyse du fichier"""
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+
+    types = {'int': pa.int64(), 'float': pa.float64(), 'date': pa.timestamp("ms"),
+             'category': pa.dictionary(pa.int32(), pa.string()), 'text': pa.string()}
+    # pyarrow ignore déjà le BOM UTF-8
+    encoding = "utf8" if schema['encoding'] in ("utf-8", "utf-8-sig") else schema['encoding']
+    table = pa_csv.read_csv(
+        _rewind(source),
+        read_options=pa_csv.ReadOptions(encoding=encoding),
+        parse_options=pa_csv.ParseOptions(delimiter=schema['delimiter']),
+        convert_options=pa_csv.ConvertOptions(include_columns=columns, column_types={c: types[k] for c, k in kinds.items()},
+                                              strings_can_be_null=True),
+    )
+    # buffers Arrow libérés au fur et à mesure de la conversion : pas de double copie du fichier en mémoire
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def _column_kind(values):
+    has_null = values.isna().any()
+    values = values.dropna()
+    if values.empty:
+        return 'text'
+
+    if not values.str.match(_LEADING_ZERO_PATTERN).any():
+        if values.str.fullmatch(_INT_PATTERN).all():
+            # entier avec des vides : float, comme le ferait le moteur
+            return 'float' if has_null else 'int'
+        if values.str.fullmatch(_FLOAT_PATTERN).all():
+            return 'float'
+    if values.str.fullmatch(_DATE_PATTERN).all():
+        return 'date'
+
+    n_distinct = values.nunique()
+    if n_distinct <= CATEGORY_MAX_VALUES and n_distinct <= CATEGORY_MAX_RATIO * len(values):
+        return 'category'
+    return 'text'
+
+
+def _sniff_encoding(raw):
+    if raw.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    # exports Excel français : cp1252 ; latin-1 accepte tous les octets
+    for encoding in ("utf-8", "cp1252"):
+        try:
+            raw.decode(encoding)
+            return encoding
+        except UnicodeDecodeError:
+            pass
+    return "latin-1"
+
+
+def _read_head(source, n_bytes):
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return f.read(n_bytes)
+    source.seek(0)
+    head = source.read(n_bytes)
+    source.seek(0)
+    return head
+
+
+def _rewind(source):
+    if not isinstance(source, (str, os.PathLike)):
+        source.seek(0)
+    return source
+
+
+def _source_size(source):
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    size = getattr(source, "size", None)
+    if size is None:
+        size = source.seek(0, os.SEEK_END)
+        source.seek(0)
+    return size
@@ -0,0 +1,143 @@
+import io
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+CUBE_DIMENSIONS = ['tranche_age', 'departement', 'sexe', 'secteur_activite', 'type_regime']
+CUBE_MEASURE = 'montant_pension_mensuelle'
+# secret statistique : cellules de moins de k assurés masquées
+CUBE_MIN_COUNT = 5
+
+_MEASURES = ('effectif', 'pension_moyenne', 'masque')
+
+
+def build_cube(df, dimensions=CUBE_DIMENSIONS, measure=CUBE_MEASURE, k=CUBE_MIN_COUNT):
+    """
+    Cube d'agrégats (effectif, pension moyenne) pour tous les sous-ensembles de dimensions.
+    Un seul passage de regroupement sur le DataFrame (cuboïde de base), les 2^d roll-ups
+    sont ensuite calculés depuis ce cuboïde. Les cellules de moins de k lignes sont masquées
+    (secret primaire), puis d'autres cellules pour qu'aucune ne se déduise des marges (secret secondaire).
+    La colonne 'dimensions' indique les dimensions regroupées, les autres valent null.
+    """
+    dims = [d for d in dimensions if d in df.columns]
+    has_measure = measure in df.columns and pd.api.types.is_numeric_dtype(df[measure])
+
+    # cuboïde de base : sommes et effectifs (additifs), la moyenne n'est calculée qu'à la fin
+    data = {'effectif': np.ones(len(df), dtype=np.int64)}
+    if has_measure:
+        data['somme'] = df[measure].fillna(0).to_numpy(dtype=float)
+        data['n_mesure'] = df[measure].notna().to_numpy(dtype=np.int64)
+    frame = pd.DataFrame(data, index=df.index)
+    for d in dims:
+        frame[d] = df[d]
+    if dims:
+        base = frame.groupby(dims, observed=True, dropna=False, sort=False).sum().reset_index()
+    else:
+        base = frame.sum().to_frame().T
+    for d in dims:
+        base[d] = base[d].astype("string").fillna("Inconnu")
+
+    cuboids = []
+    for size in range(len(dims), -1, -1):
+        for group in combinations(dims, size):
+            if group:
+                cuboid = base.groupby(list(group)).sum(numeric_only=True).reset_index()
+            else:
+                cuboid = base.sum(numeric_only=True).to_frame().T
+            cuboid['dimensions'] = ",".join(group)
+            cuboids.append(cuboid)
+
+    # une dimension absente du regroupement (agrégée) vaut null
+    cube = pd.concat(cuboids, ignore_index=True)
+    cube['masque'] = _secondary_suppression(cube, dims, cube['effectif'] < k, k)
+    result = {'dimensions': cube['dimensions'], **{d: cube[d].astype("string") for d in dims}}
+    result['effectif'] = cube['effectif'].astype("Int64").mask(cube['masque'])
+    if has_measure:
+        mean = (cube['somme'] / cube['n_mesure'].where(cube['n_mesure'] > 0)).round(2)
+        result['pension_moyenne'] = mean.mask(cube['masque'])
+    result['masque'] = cube['masque']
+    return pd.DataFrame(result)
+
+
+def _secondary_suppression(cube, dims, masked, k):
+    """
+    Secret secondaire : chaque ligne marginale (cellule parente = somme de ses cellules filles le long
+    d'une dimension) ne doit jamais contenir une seule cellule masquée, sinon elle se déduit par
+    différence (effectif, et somme des pensions via moyenne × effectif). Tant qu'une ligne a une seule
+    inconnue, ou des cellules masquées totalisant moins de k assurés, sa plus petite cellule visible
+    est masquée à son tour ; si elle n'en a plus (fille unique, égale à sa parente), la parente l'est.
+    """
+    counts = cube['effectif'].to_numpy(dtype=np.int64)
+    masked = masked.to_numpy(dtype=bool).copy()
+    lines = _marginal_lines(cube, dims)
+
+    changed = True
+    while changed:
+        changed = False
+        for children, parents in lines:
+            child_masked = masked[children]
+            n_masked = np.bincount(parents, weights=child_masked, minlength=len(counts))
+            masked_total = np.bincount(parents, weights=counts[children] * child_masked, minlength=len(counts))
+            # parente masquée : au moins une fille masquée ; parente visible : au moins deux, et au moins k assurés
+            exposed = np.where(masked, n_masked == 0, (n_masked > 0) & ((n_masked < 2) | (masked_total < k)))
+
+            candidates = np.flatnonzero(~child_masked & exposed[parents])
+            # la plus petite cellule visible de chaque ligne exposée
+            order = candidates[np.lexsort((counts[children[candidates]], parents[candidates]))]
+            first = order[np.unique(parents[order], return_index=True)[1]]
+            masked[children[first]] = True
+
+            no_candidate = exposed & ~masked
+            no_candidate[parents[candidates]] = False
+            no_candidate &= np.bincount(parents, minlength=len(counts)) > 0
+            masked |= no_candidate
+            changed |= bool(len(first) or no_candidate.any())
+    return masked
+
+
+def _marginal_lines(cube, dims):
+    """
+    Pour chaque cuboïde et chaque dimension regroupée : (positions des cellules filles,
+    position de leur cellule parente dans le cuboïde sans cette dimension).
+    """
+    names = cube['dimensions'].to_numpy()
+    positions = {name: np.flatnonzero(names == name) for name in cube['dimensions'].unique()}
+    lines = []
+    for name, children in positions.items():
+        group = name.split(",") if name else []
+        for d in group:
+            rest = [x for x in group if x != d]
+            parent_positions = positions[",".join(rest)]
+            if not rest:
+                lines.append((children, np.full(len(children), parent_positions[0])))
+                continue
+            child_keys = cube.iloc[children][rest].assign(_child=children)
+            parent_keys = cube.iloc[parent_positions][rest].assign(_parent=parent_positions)
+            merged = child_keys.merge(parent_keys, on=rest, how='left')
+            lines.append((merged['_child'].to_numpy(), merged['_parent'].to_numpy()))
+    return lines
+
+
+def rollup(cube, dimensions):
+    """Agrégats pour un sous-ensemble de dimensions, lus dans le cube précalculé"""
+    dims = [d for d in cube_dimensions(cube) if d in dimensions]
+    missing = set(dimensions) - set(dims)
+    if missing:
+        raise ValueError(f"Dimensions absentes du cube : {', '.join(sorted(missing))}")
+
+    # les groupes sont stockés dans l'ordre des colonnes du cube
+    cuboid = cube[cube['dimensions'] == ",".join(dims)]
+    measures = [c for c in cube.columns if c in _MEASURES]
+    return cuboid[dims + measures].reset_index(drop=True)
+
+
+def cube_dimensions(cube):
+    return [c for c in cube.columns if c != 'dimensions' and c not in _MEASURES]
+
+
+def cube_to_parquet(cube):
+    """Cube sérialisé en Parquet (quelques Ko, à charger par les tableaux de bord)"""
+    buffer = io.BytesIO()
+    cube.to_parquet(buffer, index=False, compression="zstd")
+    return buffer.getvalue()
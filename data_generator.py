@@ -1,13 +1,27 @@
 import pandas as pd
-from faker import Faker
 import random
 from datetime import datetime, timedelta
 
-fake = Faker('fr_FR')
+_fake = None
+
+def get_faker():
+    """Générateur Faker fr_FR, créé au premier appel (import de faker différé au premier jeu de démo)"""
+    global _fake
+    if _fake is None:
+        from faker import Faker
+        _fake = Faker('fr_FR')
+    return _fake
+
+def __getattr__(name):
+    # compatibilité : data_generator.fake reste accessible
+    if name == 'fake':
+        return get_faker()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def generate_demo_data(n_rows=10000):
     """Génère un dataset de démo pour AGIRC-ARRCO"""
     
+    fake = get_faker()
     data = []
     
     for i in range(n_rows):
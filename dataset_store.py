@@ -0,0 +1,132 @@
+import hashlib
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+import pandas as pd
+
+STORE_BUDGET_MB = int(os.getenv("RETRAISHIELD_STORE_BUDGET_MB", "2048"))
+
+
+def content_hash(df):
+    """Empreinte du contenu d'un DataFrame (valeurs, index, colonnes et types)"""
+    h = hashlib.sha1()
+    h.update(repr([(str(c), str(t)) for c, t in df.dtypes.items()]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def frame_nbytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class DatasetRef:
+    """
+    Référence en lecture seule d'une session vers un jeu de données partagé.
+    L'isolation repose sur le copy-on-write de pandas : par défaut en pandas 3, activé
+    par le point d'entrée de l'application (app.py) en pandas 2.
+    """
+
+    def __init__(self, key, df):
+        self.key = key
+        # copie superficielle : partage les données, toute écriture en crée une copie privée
+        self._df = df.copy(deep=False)
+
+    @property
+    def df(self):
+        """Le DataFrame partagé, ou None s'il a été évincé du store"""
+        return self._df
+
+    @property
+    def evicted(self):
+        return self._df is None
+
+    def _invalidate(self):
+        self._df = None
+
+
+class _Entry:
+    def __init__(self, df, nbytes):
+        self.df = df
+        self.nbytes = nbytes
+        self.refs = weakref.WeakSet()
+        self.last_access = time.time()
+
+
+class DatasetStore:
+    """
+    Store de DataFrames partagé par toutes les sessions du process, indexé par empreinte
+    de contenu. Éviction LRU sous un budget mémoire : d'abord les jeux qui ne sont plus
+    référencés par aucune session, puis, en dernier recours, les plus anciens référencés.
+    """
+
+    def __init__(self, budget_mb=STORE_BUDGET_MB):
+        self.budget_bytes = budget_mb * 1024 * 1024
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, df, key=None):
+        """Ajoute le DataFrame (ou réutilise l'exemplaire identique déjà présent) et retourne une référence"""
+        key = key or content_hash(df)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _Entry(df, frame_nbytes(df))
+                self._entries[key] = entry
+            self._entries.move_to_end(key)
+            entry.last_access = time.time()
+
+            ref = DatasetRef(key, entry.df)
+            entry.refs.add(ref)
+            self._evict(keep=key)
+        return ref
+
+    def touch(self, ref):
+        """Marque le jeu comme récemment utilisé"""
+        with self._lock:
+            if ref.key in self._entries:
+                self._entries.move_to_end(ref.key)
+                self._entries[ref.key].last_access = time.time()
+
+    def _evict(self, keep=None):
+        # 1. jeux sans session active, du moins récemment utilisé au plus récent
+        for key in [k for k, e in self._entries.items() if not e.refs and k != keep]:
+            if self._total_bytes() <= self.budget_bytes:
+                return
+            del self._entries[key]
+
+        # 2. dernier recours : jeux encore référencés (les sessions devront recharger)
+        for key in [k for k in self._entries if k != keep]:
+            if self._total_bytes() <= self.budget_bytes:
+                return
+            for ref in list(self._entries[key].refs):
+                ref._invalidate()
+            del self._entries[key]
+
+    def _total_bytes(self):
+        return sum(e.nbytes for e in self._entries.values())
+
+    def stats(self):
+        """Empreinte mémoire du store"""
+        with self._lock:
+            return {
+                'datasets': len(self._entries),
+                'bytes': self._total_bytes(),
+                'budget_bytes': self.budget_bytes,
+                'sessions': sum(len(e.refs) for e in self._entries.values()),
+            }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Retourne le store partagé du process (créé au premier appel)"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = DatasetStore()
+        return _store
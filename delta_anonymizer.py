@@ -0,0 +1,204 @@
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+
+from anonymizer import anonymize_data, hash_identifier, BAND_BOUNDS
+
+# contient les identifiants en clair : à protéger comme les données sources
+DELTA_DIR = os.getenv("RETRAISHIELD_DELTA_DIR", os.path.join(".retraishield", "delta"))
+
+# bornes des tranches d'âge de date_to_age_range
+AGE_BOUNDS = BAND_BOUNDS['tranche_age']
+
+_state_locks = {}
+_state_locks_lock = threading.Lock()
+
+
+class PseudonymVault:
+    """Table SQLite indexée id_assure → pseudonyme, pour ne jamais rehacher un identifiant connu"""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS pseudonyms (id_assure TEXT PRIMARY KEY, pseudonym TEXT NOT NULL)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def pseudonymize(self, ids):
+        """Retourne les pseudonymes de la série d'identifiants (créés et stockés si nouveaux)"""
+        keys = ids.astype(str)
+        unique_keys = pd.unique(keys)
+
+        with self._lock, self._connect() as conn:
+            conn.execute("CREATE TEMP TABLE lookup (id TEXT PRIMARY KEY)")
+            conn.executemany("INSERT INTO lookup VALUES (?)", ((k,) for k in unique_keys))
+            known = dict(conn.execute(
+                "SELECT p.id_assure, p.pseudonym FROM pseudonyms p JOIN lookup l ON l.id = p.id_assure"
+            ))
+            conn.execute("DROP TABLE lookup")
+
+            new = {k: hash_identifier(k) for k in unique_keys if k not in known}
+            conn.executemany("INSERT INTO pseudonyms VALUES (?, ?)", new.items())
+
+        known.update(new)
+        # même type que le hachage ligne à ligne d'un run complet
+        return keys.map(known).astype(keys.dtype)
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM pseudonyms").fetchone()[0]
+
+
+def anonymize_delta(df, rules, state_dir=DELTA_DIR):
+    """
+    Anonymisation incrémentale : seules les lignes nouvelles ou modifiées depuis le run
+    précédent sont traitées, les autres sont reprises du résultat précédent.
+    Le résultat fusionné est identique à celui d'un anonymize_data complet.
+    Les runs sur un même state_dir sont sérialisés (verrou de fichier entre processus).
+    Retourne (df_anon, applied_rules, stats).
+    """
+    # lecture de l'état, traitement et écriture sous le même verrou : pas de mise à jour perdue
+    with _state_lock(state_dir):
+        return _anonymize_delta(df, rules, state_dir)
+
+
+def _anonymize_delta(df, rules, state_dir):
+    now = datetime.now()
+    vault = PseudonymVault(os.path.join(state_dir, "pseudonyms.db"))
+    state_path = os.path.join(state_dir, "state.pkl")
+    signature = {'rules': dict(rules), 'columns': list(df.columns)}
+
+    # empreinte de chaque ligne source (toutes colonnes)
+    fingerprints = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    reuse = np.zeros(len(df), dtype=bool)
+    positions = np.full(len(df), -1)
+
+    state = _load_state(state_path)
+    incremental = (
+        state is not None
+        and state['signature'] == signature
+        and 'id_assure' in df.columns
+        and not df['id_assure'].duplicated().any()
+        # les groupes de microagrégation dépendent de toutes les lignes : pas de reprise partielle
+        and not rules.get('microagregation')
+    )
+    if incremental:
+        meta = state['meta']
+        positions = pd.Index(meta['id_assure']).get_indexer(df['id_assure'])
+        found = positions >= 0
+        reuse[found] = (
+            (meta['fingerprint'].to_numpy()[positions[found]] == fingerprints[found])
+            # la tranche d'âge dépend de la date du jour : on retraite les lignes qui changent de tranche
+            & (meta['band_expires'].to_numpy()[positions[found]] > np.datetime64(now))
+        )
+
+    to_process = df[~reuse]
+    df_new, applied_rules = anonymize_data(to_process, rules, pseudonymize=vault.pseudonymize)
+
+    if reuse.any():
+        df_reused = state['output'].iloc[positions[reuse]]
+        df_reused.index = df.index[reuse]
+        # remise dans l'ordre des lignes source
+        order = np.argsort(np.concatenate([np.flatnonzero(reuse), np.flatnonzero(~reuse)]), kind='stable')
+        df_anon = pd.concat([df_reused, df_new]).iloc[order]
+        # lot retraité vide : ses colonnes n'ont pas les types d'un run complet, ceux du résultat repris
+        for col, dtype in df_reused.dtypes.items():
+            if df_anon[col].dtype != dtype:
+                df_anon[col] = df_anon[col].astype(dtype)
+    else:
+        df_anon = df_new
+
+    band_expires = np.full(len(df), np.datetime64('NaT'), dtype='datetime64[ns]')
+    band_expires[~reuse] = _age_band_expiry(to_process, rules, now)
+    if reuse.any():
+        band_expires[reuse] = state['meta']['band_expires'].to_numpy()[positions[reuse]]
+
+    if 'id_assure' in df.columns:
+        meta = pd.DataFrame({
+            'id_assure': df['id_assure'].to_numpy(),
+            'fingerprint': fingerprints,
+            'band_expires': band_expires,
+        })
+        _save_state(state_path, {'signature': signature, 'meta': meta, 'output': df_anon.reset_index(drop=True)})
+
+    stats = {
+        'total': len(df),
+        'reused': int(reuse.sum()),
+        'processed': int((~reuse).sum()),
+        'new': int((positions < 0).sum()) if incremental else len(df),
+        'incremental': incremental,
+        'vault_size': len(vault),
+    }
+    return df_anon, applied_rules, stats
+
+
+def _age_band_expiry(df, rules, now):
+    """Date à laquelle la tranche d'âge de chaque ligne changera (NaT = pas de limite connue)"""
+
+    never = np.datetime64('2262-01-01')
+    if not rules.get('tranches_age', True) or 'date_naissance' not in df.columns:
+        return np.full(len(df), never, dtype='datetime64[ns]')
+
+    birth = pd.to_datetime(df['date_naissance'], errors='coerce')
+    age = ((pd.Timestamp(now) - birth).dt.days // 365).to_numpy()
+    next_bound = np.array(AGE_BOUNDS + [np.inf])[np.searchsorted(AGE_BOUNDS, np.nan_to_num(age, nan=0), side='right')]
+
+    expiry = np.full(len(df), never, dtype='datetime64[ns]')
+    finite = np.isfinite(next_bound) & birth.notna().to_numpy()
+    expiry[finite] = (birth[finite] + pd.to_timedelta(next_bound[finite] * 365, unit='D')).to_numpy()
+    # date non interprétable en vectoriel : on la retraitera à chaque run
+    unparsed = birth.isna().to_numpy() & df['date_naissance'].notna().to_numpy()
+    expiry[unparsed] = np.datetime64(now)
+    return expiry
+
+
+def _load_state(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def _save_state(path, state):
+    # écriture atomique dans un fichier temporaire propre à ce run : un run interrompu
+    # ne corrompt pas l'état précédent
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".state-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+@contextmanager
+def _state_lock(state_dir):
+    """Verrou exclusif sur l'état incrémental : threads du process, puis processus et réplicas (fcntl)"""
+    os.makedirs(state_dir, exist_ok=True)
+    key = os.path.abspath(state_dir)
+    with _state_locks_lock:
+        thread_lock = _state_locks.setdefault(key, threading.Lock())
+    with thread_lock, open(os.path.join(state_dir, "state.lock"), "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -0,0 +1,91 @@
+import gzip
+import io
+import os
+import tempfile
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+EXPORT_CHUNK_SIZE = 100_000
+# au-delà, le fichier temporaire bascule de la mémoire vers le disque
+SPOOL_MAX_SIZE = 32 * 1024 * 1024
+
+COMPRESSIONS = {
+    'aucune': ('.csv', 'text/csv'),
+    'gzip': ('.csv.gz', 'application/gzip'),
+    'zstd': ('.csv.zst', 'application/zstd'),
+}
+
+
+def available_compressions():
+    """Liste les compressions disponibles (zstd uniquement si le module est installé)"""
+    return [c for c in COMPRESSIONS if c != 'zstd' or zstandard is not None]
+
+
+def export_csv(df, header="", compression='aucune', chunk_size=EXPORT_CHUNK_SIZE, max_memory=SPOOL_MAX_SIZE):
+    """
+    Écrit l'export CSV (métadonnées + données) par blocs dans un fichier temporaire,
+    éventuellement compressé. Retourne le fichier positionné au début.
+    """
+    if compression not in available_compressions():
+        raise ValueError(f"Compression non disponible : {compression}")
+
+    spool = tempfile.SpooledTemporaryFile(max_size=max_memory)
+
+    if compression == 'gzip':
+        # niveau 6 : bon compromis vitesse / taille pour du CSV
+        stream = gzip.GzipFile(fileobj=spool, mode='wb', compresslevel=6)
+    elif compression == 'zstd':
+        # threads=-1 : compression multithread sur tous les cœurs
+        stream = zstandard.ZstdCompressor(level=3, threads=-1).stream_writer(spool, closefd=False)
+    else:
+        stream = _NonClosing(spool)
+
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='', write_through=True)
+    text.write(header)
+    for start in range(0, max(len(df), 1), chunk_size):
+        df.iloc[start:start + chunk_size].to_csv(text, index=False, header=(start == 0))
+    text.flush()
+    # on détache le wrapper pour fermer le compresseur sans fermer le fichier
+    text.detach()
+    stream.close()
+
+    spool.seek(0)
+    return spool
+
+
+def export_file_info(compression):
+    """Retourne (extension, type MIME) pour une compression"""
+    return COMPRESSIONS[compression]
+
+
+def export_size(spool):
+    """Taille en octets du fichier d'export"""
+    position = spool.tell()
+    spool.seek(0, os.SEEK_END)
+    size = spool.tell()
+    spool.seek(position)
+    return size
+
+
+def export_reader(spool):
+    """Lecture différée du fichier d'export, exécutée au clic sur le bouton de téléchargement"""
+    def read():
+        spool.seek(0)
+        return spool.read()
+    return read
+
+
+class _NonClosing(io.RawIOBase):
+    """Flux d'écriture qui ne ferme pas le fichier sous-jacent"""
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        return self._raw.write(b)
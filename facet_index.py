@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+# au-delà, la colonne n'est pas proposée comme filtre
+MAX_FACET_VALUES = 50
+# échantillon pour écarter rapidement les colonnes à forte cardinalité
+_PROBE_ROWS = 10_000
+
+# nombre de bits à 1 de chaque octet (repli si np.bitwise_count est absent, numpy < 2)
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _popcount(bitmap):
+    if hasattr(np, "bitwise_count"):
+        return int(np.bitwise_count(bitmap).sum())
+    return int(_POPCOUNT[bitmap.view(np.uint8)].sum())
+
+
+class FacetIndex:
+    """
+    Index bitmap des colonnes à faible cardinalité : une bitmap compressée (1 bit par ligne)
+    par valeur. Filtrer revient à des OU (valeurs d'une facette) et des ET (entre facettes)
+    sur les bitmaps, sans toucher au DataFrame.
+    """
+
+    def __init__(self, df, max_values=MAX_FACET_VALUES):
+        self.n_rows = len(df)
+        self.labels = {}
+        self._bitmaps = {}
+
+        for col in df.columns:
+            series = df[col]
+            if series.iloc[:_PROBE_ROWS].nunique(dropna=False) > max_values:
+                continue
+            codes, uniques = pd.factorize(series, sort=True, use_na_sentinel=False)
+            if len(uniques) > max_values or len(uniques) < 2:
+                continue
+            self.labels[col] = ["(vide)" if pd.isna(v) else str(v) for v in uniques]
+            self._bitmaps[col] = np.stack([self._pack(codes == i) for i in range(len(uniques))])
+
+    def _pack(self, mask):
+        # complété à un multiple de 64 bits pour opérer sur des mots uint64
+        bits = np.packbits(mask, bitorder="little")
+        padded = np.zeros(-(-len(bits) // 8) * 8, dtype=np.uint8)
+        padded[:len(bits)] = bits
+        return padded.view(np.uint64)
+
+    @property
+    def columns(self):
+        return list(self._bitmaps)
+
+    def _all_rows(self):
+        return self._pack(np.ones(self.n_rows, dtype=bool))
+
+    def _facet_mask(self, col, selected):
+        return np.bitwise_or.reduce(self._bitmaps[col][list(selected)], axis=0)
+
+    def mask(self, selections, exclude=None):
+        """Bitmap des lignes retenues ; selections = {colonne: [indices de valeurs]} (vide = pas de filtre)"""
+        result = self._all_rows()
+        for col, selected in selections.items():
+            if selected and col != exclude:
+                result &= self._facet_mask(col, selected)
+        return result
+
+    def count(self, selections):
+        return _popcount(self.mask(selections))
+
+    def facet_counts(self, selections):
+        """
+        Effectifs de chaque valeur de chaque facette, sous les filtres des autres facettes
+        (choisir une valeur ne fait pas tomber à 0 les autres valeurs de la même facette)
+        """
+        counts = {}
+        for col, bitmaps in self._bitmaps.items():
+            others = self.mask(selections, exclude=col)
+            counts[col] = [_popcount(bitmap & others) for bitmap in bitmaps]
+        return counts
+
+    def positions(self, selections, limit=None):
+        """Positions (iloc) des lignes retenues, éventuellement limitées aux `limit` premières"""
+        mask = self.mask(selections)
+        if limit is None:
+            return np.flatnonzero(np.unpackbits(mask.view(np.uint8), count=self.n_rows, bitorder="little"))
+
+        # aperçu : chaque mot non nul contient au moins une ligne, inutile de décompresser le reste
+        words = np.flatnonzero(mask)[:limit]
+        bits = np.unpackbits(mask[words].view(np.uint8), bitorder="little").reshape(len(words), 64)
+        rows, offsets = np.nonzero(bits)
+        return (words[rows] * 64 + offsets)[:limit]
@@ -0,0 +1,240 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# valeur par défaut du process (traitements batch) ; chaque session Streamlit la remplace
+# pour son propre contexte d'exécution (panneau développeur), sans effet sur les autres sessions
+DEFAULT_ENABLED = os.getenv("RETRAISHIELD_METRICS", "0") == "1"
+_enabled = ContextVar("retraishield_metrics", default=None)
+# intervalle d'échantillonnage de la mémoire résidente pendant les étapes mesurées
+RSS_SAMPLE_INTERVAL_S = 0.05
+
+_lock = threading.Lock()
+_spans = deque(maxlen=1000)
+_totals = {}
+_active = set()
+_sampler = None
+
+
+def is_enabled():
+    """Indique si l'instrumentation est active dans le contexte courant"""
+    value = _enabled.get()
+    return DEFAULT_ENABLED if value is None else value
+
+
+def set_enabled(value):
+    """Active ou désactive l'instrumentation pour le contexte courant (session, job lancé depuis celle-ci)"""
+    _enabled.set(bool(value))
+
+
+def peak_rss_bytes():
+    """Retourne le pic de mémoire résidente du process depuis son démarrage (en octets)"""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en Ko sous Linux, en octets sous macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def current_rss_bytes():
+    """Mémoire résidente actuelle du process (en octets), None si elle n'est pas mesurable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+class Span:
+    """Mesure d'une étape du pipeline (durée, lignes, octets, mémoire résidente)"""
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = dict(attrs)
+        self.rows = None
+        self.bytes = None
+        self.duration = None
+        self.start_rss = None
+        self.peak_rss = None
+        self.error = None
+        self._start = None
+
+    def _sample(self, rss):
+        if rss is not None and (self.peak_rss is None or rss > self.peak_rss):
+            self.peak_rss = rss
+
+    def set(self, rows=None, bytes=None, **attrs):
+        """Renseigne le volume traité par l'étape"""
+        if rows is not None:
+            self.rows = int(rows)
+        if bytes is not None:
+            self.bytes = int(bytes)
+        self.attrs.update(attrs)
+
+    def record_frame(self, df):
+        """Renseigne lignes et octets à partir d'un DataFrame"""
+        if df is not None:
+            self.set(rows=len(df), bytes=df.memory_usage(index=True).sum())
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'duration_s': self.duration,
+            'rows': self.rows,
+            'bytes': self.bytes,
+            'peak_rss_bytes': self.peak_rss,
+            # croissance de la mémoire résidente pendant l'étape (pic échantillonné - début)
+            'rss_delta_bytes': None if self.peak_rss is None else self.peak_rss - self.start_rss,
+            'error': self.error,
+            **self.attrs,
+        }
+
+
+class _NoopSpan:
+    """Span vide utilisée quand l'instrumentation est désactivée"""
+
+    def set(self, rows=None, bytes=None, **attrs):
+        pass
+
+    def record_frame(self, df):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+@contextmanager
+def span(name, **attrs):
+    """Context manager mesurant une étape du pipeline"""
+    if not is_enabled():
+        yield _NOOP
+        return
+
+    s = Span(name, attrs)
+    s.start_rss = current_rss_bytes()
+    s._sample(s.start_rss)
+    _track(s)
+    s._start = time.perf_counter()
+    try:
+        yield s
+    except Exception as e:
+        s.error = type(e).__name__
+        raise
+    finally:
+        s.duration = time.perf_counter() - s._start
+        with _lock:
+            _active.discard(s)
+        s._sample(current_rss_bytes())
+        _record(s)
+
+
+def _track(s):
+    """Ajoute la span aux étapes en cours, échantillonnées par un thread de fond"""
+    global _sampler
+    if s.start_rss is None:
+        return
+    with _lock:
+        _active.add(s)
+        if _sampler is None:
+            _sampler = threading.Thread(target=_sample_rss, name="retraishield-rss", daemon=True)
+            _sampler.start()
+
+
+def _sample_rss():
+    while True:
+        time.sleep(RSS_SAMPLE_INTERVAL_S)
+        with _lock:
+            active = list(_active)
+        if active:
+            rss = current_rss_bytes()
+            for s in active:
+                s._sample(rss)
+
+
+def _record(s):
+    with _lock:
+        _spans.append(s.as_dict())
+        total = _totals.setdefault(s.name, {'count': 0, 'duration_s': 0.0, 'rows': 0, 'bytes': 0, 'errors': 0})
+        total['count'] += 1
+        total['duration_s'] += s.duration
+        total['rows'] += s.rows or 0
+        total['bytes'] += s.bytes or 0
+        total['errors'] += 1 if s.error else 0
+
+
+def get_spans():
+    """Retourne les dernières spans enregistrées (plus récentes en dernier)"""
+    with _lock:
+        return list(_spans)
+
+
+def get_totals():
+    """Retourne les cumuls par étape"""
+    with _lock:
+        return {name: dict(total) for name, total in _totals.items()}
+
+
+def reset():
+    """Vide les mesures enregistrées"""
+    with _lock:
+        _spans.clear()
+        _totals.clear()
+
+
+def to_json():
+    """Export JSON des mesures (spans récentes + cumuls)"""
+    return json.dumps({
+        'peak_rss_bytes': peak_rss_bytes(),
+        'totals': get_totals(),
+        'spans': get_spans(),
+    }, ensure_ascii=False, indent=2)
+
+
+def to_prometheus():
+    """Export des cumuls au format texte Prometheus"""
+    totals = get_totals()
+    metrics = [
+        ('retraishield_stage_calls_total', 'counter', "Nombre d'exécutions de l'étape", 'count'),
+        ('retraishield_stage_duration_seconds_total', 'counter', "Durée cumulée de l'étape", 'duration_s'),
+        ('retraishield_stage_rows_total', 'counter', "Lignes traitées par l'étape", 'rows'),
+        ('retraishield_stage_bytes_total', 'counter', "Octets traités par l'étape", 'bytes'),
+        ('retraishield_stage_errors_total', 'counter', "Erreurs levées par l'étape", 'errors'),
+    ]
+
+    lines = []
+    for metric, kind, help_text, key in metrics:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for name, total in sorted(totals.items()):
+            lines.append(f'{metric}{{stage="{_escape_label(name)}"}} {total[key]}')
+
+    lines.append("# HELP retraishield_peak_rss_bytes Pic de mémoire résidente du process")
+    lines.append("# TYPE retraishield_peak_rss_bytes gauge")
+    lines.append(f"retraishield_peak_rss_bytes {peak_rss_bytes()}")
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(path, fmt="prometheus"):
+    """Écrit les mesures dans un fichier (pour les traitements batch)"""
+    content = to_prometheus() if fmt == "prometheus" else to_json()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
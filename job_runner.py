@@ -0,0 +1,205 @@
+import contextvars
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# répertoire de travail partagé par toutes les sessions du serveur
+JOBS_DIR = os.getenv("RETRAISHIELD_JOBS_DIR", os.path.join(".retraishield", "jobs"))
+MAX_WORKERS = int(os.getenv("RETRAISHIELD_JOB_WORKERS", "2"))
+# résultats (pickle) supprimés au-delà de cette durée : le job passe en "expiré"
+RESULT_TTL_S = float(os.getenv("RETRAISHIELD_JOB_RESULT_TTL_H", "24")) * 3600
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+INTERRUPTED = "interrupted"
+EXPIRED = "expired"
+
+FINAL_STATUSES = (DONE, FAILED, CANCELLED, INTERRUPTED, EXPIRED)
+
+
+class JobCancelled(Exception):
+    """Levée dans un job quand l'utilisateur a demandé l'annulation"""
+
+
+class JobContext:
+    """Poignée passée à la fonction du job pour remonter progression et logs"""
+
+    def __init__(self, runner, job_id):
+        self._runner = runner
+        self.job_id = job_id
+
+    def progress(self, value, text=None):
+        """Met à jour la progression (0-100) et le message courant"""
+        self._runner._update(self.job_id, progress=int(value), message=text)
+
+    def log(self, line):
+        """Ajoute une ligne aux logs partiels du job"""
+        self._runner._append_log(self.job_id, line)
+
+    def is_cancelled(self):
+        return self._runner._is_cancel_requested(self.job_id)
+
+    def check_cancelled(self):
+        """Lève JobCancelled si l'annulation a été demandée"""
+        if self.is_cancelled():
+            raise JobCancelled()
+
+
+class JobRunner:
+    """Exécute les traitements longs en arrière-plan avec une table de jobs persistante"""
+
+    def __init__(self, jobs_dir=JOBS_DIR, max_workers=MAX_WORKERS, result_ttl=RESULT_TTL_S):
+        self.jobs_dir = jobs_dir
+        self.result_ttl = result_ttl
+        os.makedirs(os.path.join(jobs_dir, "results"), exist_ok=True)
+        self._db_path = os.path.join(jobs_dir, "jobs.db")
+        self._lock = threading.Lock()
+        self._cancel_requested = set()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="retraishield-job")
+
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    progress INTEGER NOT NULL DEFAULT 0,
+                    message TEXT,
+                    logs TEXT NOT NULL DEFAULT '[]',
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+            """)
+            # les jobs en cours lors d'un redémarrage du serveur ne reprendront pas
+            conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ? WHERE status IN (?, ?)",
+                (INTERRUPTED, time.time(), PENDING, RUNNING)
+            )
+        self.purge_results()
+
+    def _connect(self):
+        return sqlite3.connect(self._db_path, timeout=30)
+
+    def submit(self, kind, func, *args, **kwargs):
+        """Soumet func(ctx, *args, **kwargs) et retourne l'identifiant du job"""
+        self.purge_results()
+        job_id = uuid.uuid4().hex[:12]
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, kind, PENDING, time.time())
+            )
+        # contexte de l'appelant (ex: instrumentation activée pour cette session) transmis au job
+        context = contextvars.copy_context()
+        self._executor.submit(context.run, self._run, job_id, func, args, kwargs)
+        return job_id
+
+    def _run(self, job_id, func, args, kwargs):
+        ctx = JobContext(self, job_id)
+        if ctx.is_cancelled():
+            self._update(job_id, status=CANCELLED, finished_at=time.time())
+            return
+
+        self._update(job_id, status=RUNNING, started_at=time.time())
+        try:
+            result = func(ctx, *args, **kwargs)
+            with open(self._result_path(job_id), "wb") as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            self._update(job_id, status=DONE, progress=100, finished_at=time.time())
+        except JobCancelled:
+            self._update(job_id, status=CANCELLED, message="Annulé", finished_at=time.time())
+        except Exception as e:
+            self._append_log(job_id, traceback.format_exc())
+            self._update(job_id, status=FAILED, error=str(e), finished_at=time.time())
+        finally:
+            with self._lock:
+                self._cancel_requested.discard(job_id)
+
+    def _update(self, job_id, **fields):
+        fields = {k: v for k, v in fields.items() if v is not None}
+        if not fields:
+            return
+        assignments = ", ".join(f"{k} = ?" for k in fields)
+        with self._lock, self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def _append_log(self, job_id, line):
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT logs FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            logs = json.loads(row[0]) if row else []
+            logs.append(line)
+            conn.execute("UPDATE jobs SET logs = ? WHERE id = ?", (json.dumps(logs, ensure_ascii=False), job_id))
+
+    def _is_cancel_requested(self, job_id):
+        with self._lock:
+            return job_id in self._cancel_requested
+
+    def _result_path(self, job_id):
+        return os.path.join(self.jobs_dir, "results", f"{job_id}.pkl")
+
+    def cancel(self, job_id):
+        """Demande l'annulation (prise en compte au prochain point de contrôle du job)"""
+        with self._lock:
+            self._cancel_requested.add(job_id)
+
+    def get(self, job_id):
+        """Retourne l'état du job sous forme de dict, ou None s'il est inconnu"""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['logs'] = json.loads(job['logs'])
+        return job
+
+    def result(self, job_id):
+        """Charge le résultat d'un job terminé (None s'il n'existe pas)"""
+        path = self._result_path(job_id)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def purge_results(self):
+        """Supprime les résultats plus anciens que result_ttl (jobs marqués expirés)"""
+        results_dir = os.path.join(self.jobs_dir, "results")
+        cutoff = time.time() - self.result_ttl
+        expired = []
+        for name in os.listdir(results_dir):
+            path = os.path.join(results_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    expired.append(os.path.splitext(name)[0])
+            except OSError:
+                # supprimé entre-temps par un autre processus
+                continue
+        if expired:
+            with self._lock, self._connect() as conn:
+                conn.executemany("UPDATE jobs SET status = ? WHERE id = ? AND status = ?",
+                                 [(EXPIRED, job_id, DONE) for job_id in expired])
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_runner():
+    """Retourne le runner partagé du process (créé au premier appel)"""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner()
+        return _runner
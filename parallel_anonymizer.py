@@ -0,0 +1,161 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context, shared_memory
+
+import pandas as pd
+import pyarrow as pa
+
+from anonymizer import anonymize_data, apply_global_rules, rewritten_columns, BAND_DTYPES
+
+# en dessous, le coût de démarrage des workers dépasse le gain
+PARALLEL_MIN_ROWS = 200_000
+DEFAULT_WORKERS = int(os.getenv("RETRAISHIELD_ANON_WORKERS", str(os.cpu_count() or 1)))
+MAX_WORKERS = max(os.cpu_count() or 1, DEFAULT_WORKERS)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def anonymize_data_parallel(df, rules, n_workers=None, n_partitions=None, min_rows=PARALLEL_MIN_ROWS):
+    """
+    Applique anonymize_data sur des partitions de lignes dans un pool de processus.
+    Les partitions transitent en Arrow IPC dans des segments de mémoire partagée.
+    Même résultat que anonymize_data (ordre des lignes, index et types conservés).
+    """
+
+    n_workers = n_workers or DEFAULT_WORKERS
+    n_partitions = max(1, min(n_partitions or n_workers * 2, len(df)))
+    if n_workers <= 1 or n_partitions <= 1 or len(df) < min_rows:
+        return anonymize_data(df, rules)
+
+    # la microagrégation porte sur tout le jeu : faite avant le découpage en partitions
+    df, rules, global_rules = apply_global_rules(df, rules)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    bounds = [len(df) * i // n_partitions for i in range(n_partitions + 1)]
+
+    segments = []
+    futures = []
+    parts = []
+    pool = _get_pool()
+    try:
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            segments.append(_to_shared_memory(table.slice(start, end - start)))
+
+        def submit(i):
+            shm, size = segments[i]
+            return pool.submit(_anonymize_partition, shm.name, size, rules)
+
+        # pool partagé dimensionné au maximum : au plus n_workers partitions en cours pour ce run
+        futures = [submit(i) for i in range(min(n_workers, n_partitions))]
+        applied_rules = []
+        for i in range(n_partitions):
+            name, size, applied_rules = futures[i].result()
+            parts.append(_read_frame(name, size, unlink=True))
+            if len(futures) < n_partitions:
+                futures.append(submit(len(futures)))
+    except BrokenProcessPool:
+        # un worker est mort : le pool est inutilisable, le prochain appel en recrée un
+        _drop_pool(pool)
+        raise
+    finally:
+        # en cas d'erreur, les partitions déjà lancées publient quand même leur résultat : on l'attend pour le libérer
+        for future in futures[len(parts):]:
+            if future.cancel():
+                continue
+            try:
+                name, _, _ = future.result()
+            except Exception:
+                continue
+            _unlink(name)
+        for shm, _ in segments:
+            shm.close()
+            shm.unlink()
+
+    df_anon = pd.concat(parts, ignore_index=True)
+    df_anon.index = df.index
+
+    # chaque partition n'a encodé que les tranches présentes : on rétablit les catégories communes
+    for col, dtype in BAND_DTYPES.items():
+        if col in df_anon.columns:
+            df_anon[col] = df_anon[col].astype(dtype)
+    # types d'origine, sauf pour les colonnes recalculées (identifiant haché, département)
+    rewritten = rewritten_columns(rules)
+    for col in df_anon.columns:
+        if col in df.columns and df_anon[col].dtype != df[col].dtype and col not in BAND_DTYPES and col not in rewritten:
+            df_anon[col] = df_anon[col].astype(df[col].dtype)
+
+    return df_anon, applied_rules + global_rules
+
+
+def _anonymize_partition(name, size, rules):
+    """Exécuté dans un worker : lit la partition, l'anonymise et publie le résultat en mémoire partagée"""
+    df = _read_frame(name, size)
+    df_anon, applied_rules = anonymize_data(df, rules)
+
+    shm, out_size = _to_shared_memory(pa.Table.from_pandas(df_anon, preserve_index=False))
+    # le processus parent lit puis libère le segment
+    shm.close()
+    return shm.name, out_size, applied_rules
+
+
+def _to_shared_memory(table):
+    # taille exacte du flux IPC, puis écriture directe dans le segment partagé
+    mock = pa.MockOutputStream()
+    _write_ipc(mock, table)
+    size = mock.size()
+
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    sink = pa.FixedSizeBufferWriter(pa.py_buffer(shm.buf))
+    _write_ipc(sink, table)
+    sink.close()
+    # le segment ne doit plus être référencé par Arrow pour pouvoir être fermé
+    del sink
+    return shm, size
+
+
+def _write_ipc(sink, table):
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def _read_frame(name, size, unlink=False):
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        # une seule copie mémoire du segment (to_pandas peut référencer les buffers Arrow
+        # sans copie : ils ne doivent pas pointer vers un segment qui va être libéré)
+        data = pa.py_buffer(bytes(shm.buf[:size]))
+        return pa.ipc.open_stream(data).read_all().to_pandas()
+    finally:
+        shm.close()
+        if unlink:
+            shm.unlink()
+
+
+def _unlink(name):
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        # déjà libéré par _read_frame
+        return
+    shm.close()
+    shm.unlink()
+
+
+def _get_pool():
+    """Pool de processus unique réutilisé entre les appels (workers démarrés à la demande, démarrage amorti)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn : pas de fork d'un serveur Streamlit multithreadé
+            _pool = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=get_context("spawn"))
+        return _pool
+
+
+def _drop_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,209 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import pandas as pd
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# dictionnaires supplémentaires : un fichier <type>.txt par type de terme, un terme par ligne
+# (ex: noms.txt, prenoms.txt, communes.txt issus des fichiers INSEE)
+PII_DICT_DIR = os.getenv("RETRAISHIELD_PII_DICT_DIR", "")
+# en dessous, un seul processus (démarrage des workers plus coûteux que le scan)
+PARALLEL_MIN_VALUES = 200_000
+SCAN_CHUNK_SIZE = 50_000
+MIN_TERM_LENGTH = 3
+
+NIR_PATTERN = re.compile(
+    r"(?<![\dA-Z])([12])\s?(\d{2})\s?(0[1-9]|1[0-2]|[2-9]\d)\s?(\d{2}|2[AB])\s?(\d{3})\s?(\d{3})\s?(\d{2})(?![\dA-Z])"
+)
+PATTERNS = {
+    'email': re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+"),
+    'telephone': re.compile(r"(?<![\w+])(?:\+33\s?|0)[1-9](?:[\s.-]?\d{2}){4}(?!\w)"),
+}
+
+
+def normalize_text(values):
+    """Minuscules sans accents, séparateurs (espaces, tirets, apostrophes...) réduits à un espace"""
+    return (pd.Series(values, dtype="string")
+            .str.normalize("NFKD").str.encode("ascii", "ignore").str.decode("ascii")
+            .str.lower().str.replace(r"[^a-z0-9]+", " ", regex=True).str.strip())
+
+
+def valid_nir(match):
+    """Vérifie la clé de contrôle d'un NIR (97 - numéro modulo 97, Corse 2A/2B → 19/18)"""
+    sex, year, month, dept, commune, order, key = match.groups()
+    dept = {'2A': '19', '2B': '18'}.get(dept, dept)
+    number = int(sex + year + month + dept + commune + order)
+    return 97 - number % 97 == int(key)
+
+
+def default_dictionaries(source=None):
+    """
+    Dictionnaires de termes par type : prénoms et noms de Faker, valeurs des colonnes
+    identifiantes du jeu source (ce qui pourrait avoir fuité), fichiers de PII_DICT_DIR.
+    """
+    from faker.providers.person.fr_FR import Provider as PersonProvider
+
+    dictionaries = {
+        'nom': set(PersonProvider.last_names),
+        'prenom': set(PersonProvider.first_names_male) | set(PersonProvider.first_names_female),
+    }
+
+    if source is not None:
+        for col, kind in (('nom', 'nom'), ('prenom', 'prenom'), ('commune', 'commune'), ('id_assure', 'identifiant')):
+            if col in source.columns:
+                dictionaries.setdefault(kind, set()).update(source[col].dropna().astype(str).unique())
+
+    if PII_DICT_DIR and os.path.isdir(PII_DICT_DIR):
+        for name in sorted(os.listdir(PII_DICT_DIR)):
+            if name.endswith(".txt"):
+                with open(os.path.join(PII_DICT_DIR, name), encoding="utf-8") as f:
+                    dictionaries.setdefault(name[:-4], set()).update(line.strip() for line in f if line.strip())
+
+    return dictionaries
+
+
+class TermMatcher:
+    """
+    Recherche simultanée de tous les termes (mots entiers, après normalisation) dans un texte.
+    Automate Aho-Corasick (pyahocorasick) si disponible, sinon table des n-grammes de mots.
+    """
+
+    def __init__(self, dictionaries):
+        self.max_tokens = 1
+        self._terms = {}
+        for kind, terms in dictionaries.items():
+            normalized = normalize_text(list(terms)).dropna()
+            # au moins une lettre : les codes numériques courts sont ignorés
+            normalized = normalized[(normalized.str.len() >= MIN_TERM_LENGTH) & normalized.str.contains("[a-z]")]
+            for term in normalized.unique():
+                self._terms.setdefault(term, kind)
+        self.max_tokens = max((term.count(" ") + 1 for term in self._terms), default=1)
+
+        self._automaton = None
+        if ahocorasick is not None and self._terms:
+            # espaces autour des termes : une correspondance ne peut commencer ou finir qu'en bordure de mot
+            self._automaton = ahocorasick.Automaton()
+            for term, kind in self._terms.items():
+                self._automaton.add_word(f" {term} ", (kind, term))
+            self._automaton.make_automaton()
+
+    def __len__(self):
+        return len(self._terms)
+
+    def find(self, text):
+        """Liste des (type, terme) présents dans un texte déjà normalisé"""
+        if self._automaton is not None:
+            return [value for _, value in self._automaton.iter(f" {text} ")]
+
+        tokens = text.split()
+        hits = []
+        for i in range(len(tokens)):
+            for n in range(1, min(self.max_tokens, len(tokens) - i) + 1):
+                term = " ".join(tokens[i:i + n])
+                if term in self._terms:
+                    hits.append((self._terms[term], term))
+        return hits
+
+
+class PiiScanner:
+    """Recherche de données personnelles résiduelles dans les colonnes texte d'un DataFrame"""
+
+    def __init__(self, dictionaries):
+        self.dictionaries = dictionaries
+        self.matcher = TermMatcher(dictionaries)
+
+    def scan(self, df, columns=None, n_workers=None, min_parallel=PARALLEL_MIN_VALUES):
+        """
+        Retourne un DataFrame (colonne, type, lignes, exemples masqués) des correspondances trouvées.
+        Chaque valeur distincte n'est analysée qu'une fois ; les blocs de valeurs sont répartis
+        sur n_workers processus au-delà de min_parallel valeurs distinctes.
+        """
+        columns = columns or [c for c in df.columns if _is_text(df[c])]
+
+        tasks = []
+        counts = {}
+        for col in columns:
+            value_counts = df[col].value_counts()
+            value_counts = value_counts[value_counts > 0]
+            counts[col] = value_counts.to_numpy()
+            values = value_counts.index.astype(str).tolist()
+            for start in range(0, len(values), SCAN_CHUNK_SIZE):
+                tasks.append((col, start, values[start:start + SCAN_CHUNK_SIZE]))
+
+        n_workers = n_workers or os.cpu_count() or 1
+        n_values = sum(len(values) for _, _, values in tasks)
+        if n_workers > 1 and n_values >= min_parallel and len(tasks) > 1:
+            # spawn : pas de fork d'un serveur Streamlit multithreadé ; l'automate est construit une fois par worker
+            with ProcessPoolExecutor(max_workers=n_workers, mp_context=get_context("spawn"),
+                                     initializer=_init_worker, initargs=(self.dictionaries,)) as pool:
+                results = list(pool.map(_scan_values, [values for _, _, values in tasks]))
+        else:
+            results = [_scan_values(values, self.matcher) for _, _, values in tasks]
+
+        rows = {}
+        for (col, start, values), hits in zip(tasks, results):
+            for position, kind, example in hits:
+                entry = rows.setdefault((col, kind), {'lignes': 0, 'exemples': []})
+                entry['lignes'] += int(counts[col][start + position])
+                if len(entry['exemples']) < 3 and example not in entry['exemples']:
+                    entry['exemples'].append(example)
+
+        return pd.DataFrame(
+            [{'colonne': col, 'type': kind, 'lignes': e['lignes'], 'exemples': ", ".join(e['exemples'])}
+             for (col, kind), e in rows.items()],
+            columns=['colonne', 'type', 'lignes', 'exemples'],
+        )
+
+
+def _is_text(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return not pd.api.types.is_numeric_dtype(series.cat.categories.dtype)
+    return pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype)
+
+
+def _mask(text):
+    # exemple affiché sans révéler la donnée complète
+    return text[:3] + "…" if len(text) > 3 else text
+
+
+_worker_matcher = None
+
+
+def _init_worker(dictionaries):
+    global _worker_matcher
+    _worker_matcher = TermMatcher(dictionaries)
+
+
+def _scan_values(values, matcher=None):
+    """Analyse un bloc de valeurs distinctes ; retourne les (position, type, exemple) trouvés"""
+    matcher = matcher if matcher is not None else _worker_matcher
+    hits = []
+
+    for position, text in enumerate(normalize_text(values).fillna("")):
+        kinds = set()
+        for kind, term in matcher.find(text):
+            if kind not in kinds:
+                kinds.add(kind)
+                hits.append((position, kind, _mask(term)))
+
+    # expressions régulières seulement sur les valeurs candidates (un @ ou au moins 9 chiffres)
+    raw = pd.Series(values, dtype="string")
+    candidates = raw.str.contains("@", regex=False) | (raw.str.count(r"\d") >= 9)
+    for position in candidates.to_numpy().nonzero()[0]:
+        value = values[position]
+        for match in NIR_PATTERN.finditer(value.upper()):
+            if valid_nir(match):
+                hits.append((position, 'nir', _mask(match.group(0))))
+                break
+        for kind, pattern in PATTERNS.items():
+            match = pattern.search(value)
+            if match:
+                hits.append((position, kind, _mask(match.group(0))))
+
+    return hits
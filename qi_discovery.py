@@ -0,0 +1,148 @@
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+# 2^12 registres : erreur relative ~1,6 % sur le nombre de valeurs distinctes
+HLL_PRECISION = 12
+DISCOVERY_CHUNK_SIZE = 200_000
+# colonnes candidates pour les paires, paires étendues en triplets
+MAX_PAIR_COLUMNS = 20
+TRIPLE_BEAM = 20
+# au-delà, la colonne est un identifiant à elle seule (pas un quasi-identifiant)
+IDENTIFIER_RATIO = 0.95
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+class HyperLogLog:
+    """Sketch de cardinalité HyperLogLog sur des hachages 64 bits"""
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.int64)
+
+    def update(self, hashes):
+        p = self.precision
+        m = len(self.registers)
+        buckets = (hashes >> np.uint64(64 - p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - p)) - 1)
+        # rang du premier bit à 1 des bits restants (frexp : exposant du flottant)
+        exponents = np.frexp(rest.astype(np.float64))[1]
+        rho = np.where(rest > 0, 64 - p - exponents + 1, 64 - p + 1)
+
+        # maximum de rho par registre via un histogramme (registre, rho)
+        seen = np.bincount(buckets * 64 + rho, minlength=m * 64).reshape(m, 64) > 0
+        chunk_max = np.where(seen.any(axis=1), 63 - np.argmax(seen[:, ::-1], axis=1), 0)
+        np.maximum(self.registers, chunk_max, out=self.registers)
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(2.0 ** -self.registers)
+        zeros = np.count_nonzero(self.registers == 0)
+        # petites cardinalités : comptage linéaire
+        if raw <= 2.5 * m and zeros:
+            return m * np.log(m / zeros)
+        return raw
+
+
+def _mix(a, b):
+    # combinaison de deux hachages (finaliseur splitmix64)
+    with np.errstate(over="ignore"):
+        z = a * _GOLDEN ^ b
+        z ^= z >> np.uint64(30)
+        z *= np.uint64(0xBF58476D1CE4E5B9)
+        z ^= z >> np.uint64(27)
+        z *= np.uint64(0x94D049BB133111EB)
+        z ^= z >> np.uint64(31)
+    return z
+
+
+def _combo_hash(hashes, combo):
+    h = hashes[combo[0]]
+    for col in combo[1:]:
+        h = _mix(h, hashes[col])
+    return h
+
+
+def _update_sketches(sketches, combos, hashes):
+    """Met à jour les sketches d'un bloc ; le hachage d'un préfixe commun (paire d'un triplet) est réutilisé"""
+    last_prefix, prefix_hash = None, None
+    # ordre lexicographique : les combinaisons de même préfixe se suivent, un seul préfixe en mémoire
+    for combo in sorted(combos):
+        if len(combo) == 1:
+            sketches[combo].update(hashes[combo[0]])
+            continue
+        if combo[:-1] != last_prefix:
+            last_prefix, prefix_hash = combo[:-1], _combo_hash(hashes, combo[:-1])
+        sketches[combo].update(_mix(prefix_hash, hashes[combo[-1]]))
+
+
+def discover_quasi_identifiers(df, columns=None, chunk_size=DISCOVERY_CHUNK_SIZE, max_pair_columns=MAX_PAIR_COLUMNS,
+                               beam=TRIPLE_BEAM, identifier_ratio=IDENTIFIER_RATIO, precision=HLL_PRECISION):
+    """
+    Estime le nombre de valeurs distinctes des colonnes, paires et triplets de colonnes
+    (sketches HyperLogLog mis à jour en une seule passe par blocs de lignes) et les classe
+    du plus identifiant au moins identifiant.
+    Les paires portent sur les max_pair_columns colonnes les plus variées, les triplets
+    étendent les `beam` meilleures paires du premier bloc.
+    Retourne un DataFrame (colonnes, taille, distinct, ratio, identifiant).
+    """
+    columns = list(columns or df.columns)
+    n_rows = len(df)
+    if n_rows == 0 or not columns:
+        return pd.DataFrame(columns=['colonnes', 'taille', 'distinct', 'ratio', 'identifiant'])
+
+    sketches = {}
+
+    for start in range(0, n_rows, chunk_size):
+        chunk = df.iloc[start:start + chunk_size]
+        hashes = {c: pd.util.hash_pandas_object(chunk[c], index=False).to_numpy() for c in columns}
+
+        if start == 0:
+            # choix des combinaisons sur le premier bloc
+            singles = [(c,) for c in columns]
+            sketches.update((combo, HyperLogLog(precision)) for combo in singles)
+            _update_sketches(sketches, singles, hashes)
+            first_ratio = {c: sketches[(c,)].estimate() / len(chunk) for c in columns}
+            # identifiants et constantes n'apportent rien aux combinaisons
+            candidates = sorted((c for c in columns if 1.5 <= sketches[(c,)].estimate() and first_ratio[c] < identifier_ratio),
+                                key=lambda c: -first_ratio[c])[:max_pair_columns]
+            pairs = list(combinations(sorted(candidates, key=columns.index), 2))
+            sketches.update((combo, HyperLogLog(precision)) for combo in pairs)
+            _update_sketches(sketches, pairs, hashes)
+
+            best_pairs = sorted(pairs, key=lambda k: -sketches[k].estimate())[:beam]
+            triples = {tuple(sorted(pair + (c,), key=columns.index)) for pair in best_pairs for c in candidates if c not in pair}
+            sketches.update((combo, HyperLogLog(precision)) for combo in triples)
+            _update_sketches(sketches, triples, hashes)
+            continue
+
+        _update_sketches(sketches, sketches, hashes)
+
+    rows = []
+    for combo, sketch in sketches.items():
+        distinct = min(sketch.estimate(), n_rows)
+        rows.append({'colonnes': list(combo), 'taille': len(combo), 'distinct': int(round(distinct)),
+                     'ratio': distinct / n_rows})
+    result = pd.DataFrame(rows)
+    result['identifiant'] = (result['taille'] == 1) & (result['ratio'] >= identifier_ratio)
+
+    # on ne garde une combinaison que si elle identifie mieux que chacune de ses sous-combinaisons
+    ratio_of = {tuple(c): r for c, r in zip(result['colonnes'], result['ratio'])}
+    keep = [
+        size == 1 or all(ratio > ratio_of.get(sub, 0) + 0.01 for sub in combinations(cols, size - 1))
+        for cols, size, ratio in zip(result['colonnes'], result['taille'], result['ratio'])
+    ]
+    result = result[keep]
+    return result.sort_values(['ratio', 'taille'], ascending=[False, True], kind='stable').reset_index(drop=True)
+
+
+def suggested_quasi_identifiers(discovery, exclude=()):
+    """Colonnes de la combinaison la plus identifiante (hors identifiants directs)"""
+    for cols, is_identifier in zip(discovery['colonnes'], discovery['identifiant']):
+        cols = list(cols)
+        if not is_identifier and not set(cols) & set(exclude):
+            return cols
+    return []
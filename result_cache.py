@@ -0,0 +1,224 @@
+import ast
+import hashlib
+import inspect
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from dataset_store import content_hash
+
+# répertoire partageable entre réplicas (volume commun)
+CACHE_DIR = os.getenv("RETRAISHIELD_CACHE_DIR", os.path.join(".retraishield", "cache"))
+CACHE_MAX_MB = int(os.getenv("RETRAISHIELD_CACHE_MB", "4096"))
+# à incrémenter si le format de stockage change
+CACHE_FORMAT_VERSION = 1
+
+_MANIFEST = "manifest.json"
+# écriture interrompue (processus tué) : répertoire temporaire supprimé par l'éviction après ce délai
+_TMP_MAX_AGE_S = 3600
+# modules de l'application (à plat à la racine du dépôt)
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    """
+    Cache disque adressé par contenu : (empreinte du dataset, fonction, version du code,
+    paramètres) → résultat en Parquet / NumPy / JSON. Écritures atomiques, taille bornée
+    avec éviction LRU (date d'accès portée par le manifeste de chaque entrée).
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_mb=CACHE_MAX_MB):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_mb * 1024 * 1024
+        os.makedirs(cache_dir, exist_ok=True)
+        self._code_versions = {}
+        self._lock = threading.Lock()
+
+    def key(self, func, dataset_key, params=None):
+        """Clé de cache ; toute modification du module de la fonction ou des modules qu'il importe change la clé"""
+        payload = json.dumps({
+            'format': CACHE_FORMAT_VERSION,
+            'function': f"{func.__module__}.{func.__qualname__}",
+            'code': self._code_version(func),
+            'dataset': dataset_key,
+            'params': params or {},
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _code_version(self, func):
+        module = inspect.getmodule(func)
+        name = module.__name__ if module else func.__qualname__
+        if name not in self._code_versions:
+            digest = hashlib.sha1()
+            if module is None:
+                digest.update(inspect.getsource(func).encode())
+            else:
+                for path in sorted(_local_dependencies(inspect.getsourcefile(module))):
+                    with open(path, "rb") as f:
+                        digest.update(f.read())
+            self._code_versions[name] = digest.hexdigest()
+        return self._code_versions[name]
+
+    def get(self, key):
+        """Retourne (True, résultat) si la clé est en cache, sinon (False, None)"""
+        path = os.path.join(self.cache_dir, key)
+        try:
+            with open(os.path.join(path, _MANIFEST), encoding="utf-8") as f:
+                manifest = json.load(f)
+            value = _read_value(path, manifest['value'])
+            # accès récent : l'entrée remonte dans l'ordre LRU
+            os.utime(os.path.join(path, _MANIFEST))
+            return True, value
+        except (OSError, ValueError, KeyError):
+            # absente, ou supprimée par un autre réplica pendant la lecture
+            return False, None
+
+    def put(self, key, value):
+        """
+        Écrit le résultat (écriture dans un répertoire temporaire puis renommage atomique).
+        Le cache est facultatif : un échec d'écriture est journalisé, jamais propagé.
+        """
+        final_path = os.path.join(self.cache_dir, key)
+        tmp_path = os.path.join(self.cache_dir, f".tmp-{key}-{uuid.uuid4().hex}")
+        try:
+            os.makedirs(tmp_path)
+            manifest = {'value': _write_value(tmp_path, value, "0"), 'created_at': time.time()}
+            with open(os.path.join(tmp_path, _MANIFEST), "w", encoding="utf-8") as f:
+                json.dump(manifest, f)
+            os.rename(tmp_path, final_path)
+        except Exception:
+            # entrée déjà écrite par un autre réplica, disque plein, type non sérialisable...
+            if not os.path.exists(os.path.join(final_path, _MANIFEST)):
+                logger.warning("Résultat non mis en cache (%s)", key, exc_info=True)
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        self.evict()
+
+    def call_key(self, func, dataset_key, *args, key_params=None, **kwargs):
+        """Clé de cache de l'appel func(df, *args, **kwargs) sur le jeu dataset_key (celle utilisée par cached_call)"""
+        params = {'args': args, 'kwargs': kwargs, **(key_params or {})}
+        return self.key(func, dataset_key, params)
+
+    def cached_call(self, func, df, *args, dataset_key=None, key_params=None, **kwargs):
+        """
+        Appelle func(df, *args, **kwargs) en passant par le cache.
+        key_params complète la clé pour ce qui n'est pas dans les arguments (ex: date du jour).
+        """
+        key = self.call_key(func, dataset_key or content_hash(df), *args, key_params=key_params, **kwargs)
+
+        hit, value = self.get(key)
+        if hit:
+            return value
+        value = func(df, *args, **kwargs)
+        self.put(key, value)
+        return value
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.startswith(".tmp-"):
+                _remove_stale_tmp(path)
+                continue
+            try:
+                accessed = os.path.getmtime(os.path.join(path, _MANIFEST))
+                size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+            except OSError:
+                continue
+            entries.append((accessed, size, path))
+        return entries
+
+    def evict(self):
+        """Supprime les entrées les moins récemment utilisées au-delà de la taille maximale"""
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+
+
+def _remove_stale_tmp(path):
+    try:
+        if time.time() - os.path.getmtime(path) > _TMP_MAX_AGE_S:
+            shutil.rmtree(path, ignore_errors=True)
+    except OSError:
+        pass
+
+
+def _local_dependencies(path):
+    """Fichier source et modules de l'application qu'il importe, transitivement (imports différés compris)"""
+    found = set()
+    stack = [os.path.abspath(path)]
+    while stack:
+        current = stack.pop()
+        if current in found:
+            continue
+        found.add(current)
+        with open(current, encoding="utf-8") as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                candidate = os.path.join(_APP_DIR, name.split(".")[0] + ".py")
+                if os.path.exists(candidate):
+                    stack.append(candidate)
+    return found
+
+
+def _write_value(path, value, name):
+    """Sérialise une valeur (DataFrame, Series, ndarray, tuple ou JSON) et retourne sa description"""
+    if isinstance(value, pd.DataFrame):
+        value.to_parquet(os.path.join(path, f"{name}.parquet"))
+        return {'kind': 'dataframe', 'file': f"{name}.parquet"}
+    if isinstance(value, pd.Series):
+        value.to_frame(name='value').to_parquet(os.path.join(path, f"{name}.parquet"))
+        return {'kind': 'series', 'file': f"{name}.parquet", 'name': value.name}
+    if isinstance(value, np.ndarray):
+        np.save(os.path.join(path, f"{name}.npy"), value, allow_pickle=False)
+        return {'kind': 'ndarray', 'file': f"{name}.npy"}
+    if isinstance(value, tuple):
+        return {'kind': 'tuple', 'items': [_write_value(path, v, f"{name}_{i}") for i, v in enumerate(value)]}
+    return {'kind': 'json', 'value': value}
+
+
+def _read_value(path, desc):
+    kind = desc['kind']
+    if kind == 'dataframe':
+        return pd.read_parquet(os.path.join(path, desc['file']))
+    if kind == 'series':
+        return pd.read_parquet(os.path.join(path, desc['file']))['value'].rename(desc['name'])
+    if kind == 'ndarray':
+        return np.load(os.path.join(path, desc['file']), allow_pickle=False)
+    if kind == 'tuple':
+        return tuple(_read_value(path, d) for d in desc['items'])
+    return desc['value']
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Retourne le cache disque partagé du process (créé au premier appel)"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
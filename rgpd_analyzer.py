@@ -1,5 +1,11 @@
 import pandas as pd
+import numpy as np
 import re
+from math import lgamma
+from statistics import NormalDist
+
+APPROX_SAMPLE_SIZE = 200_000
+APPROX_JACKKNIFE_GROUPS = 10
 
 def classify_columns(df):
     """Classe les colonnes en 4 catégories RGPD"""
@@ -50,6 +56,91 @@ def calculate_k_anonymity(df, quasi_identifiers):
     
     return df_k['k']
 
+def information_loss(original, anonymized, columns):
+    """
+    Perte d'information des colonnes numériques conservées (ex: microagrégation) :
+    SSE entre valeurs d'origine et valeurs publiées, sur colonnes centrées réduites,
+    et part de la variance totale (SST) qu'elle représente. None si rien à comparer.
+    """
+    cols = [c for c in columns if c in original.columns and c in anonymized.columns]
+    if not cols or not original.index.equals(anonymized.index):
+        return None
+    
+    x = original[cols].to_numpy(dtype=float)
+    y = anonymized[cols].to_numpy(dtype=float)
+    std = np.nanstd(x, axis=0)
+    std[std == 0] = 1
+    
+    sse = float(np.nansum(((x - y) / std) ** 2))
+    sst = float(np.nansum(((x - np.nanmean(x, axis=0)) / std) ** 2))
+    return {'sse': sse, 'sst': sst, 'loss_pct': 100 * sse / sst if sst else 0.0, 'columns': cols}
+
+def prepare_quasi_identifiers(df, quasi_identifiers):
+    """Projette les colonnes utiles et dérive annee_naissance / departement si demandés"""
+    
+    df_calc = df[[c for c in df.columns if c in quasi_identifiers or c in ('date_naissance', 'code_postal')]]
+    if 'annee_naissance' in quasi_identifiers:
+        df_calc = df_calc.assign(annee_naissance=pd.to_datetime(df_calc['date_naissance']).dt.year)
+    if 'departement' in quasi_identifiers and 'departement' not in df.columns:
+        df_calc = df_calc.assign(departement=df_calc['code_postal'].astype(str).str[:2])
+    return df_calc
+
+def equivalence_classes(df, quasi_identifiers, derive=False, backend="pandas"):
+    """
+    Table des classes d'équivalence (combinaison de QI → k), triée par k croissant.
+    derive=True dérive d'abord annee_naissance / departement (voir prepare_quasi_identifiers).
+    backend="polars" calcule la même table en un seul plan lazy (voir backends.py).
+    """
+    
+    if backend != "pandas":
+        # import différé : backends importe anonymizer, et Polars n'est chargé qu'à l'usage
+        from backends import check_backend, polars_equivalence_classes
+        check_backend(backend)
+        return polars_equivalence_classes(df, quasi_identifiers, derive)
+    
+    if derive:
+        df = prepare_quasi_identifiers(df, quasi_identifiers)
+    
+    if not quasi_identifiers:
+        return pd.DataFrame({'k': [len(df)]} if len(df) else {'k': []})
+    
+    classes = df.groupby(quasi_identifiers, dropna=False, observed=True).size().reset_index(name='k')
+    
+    # tri stable par k : les classes risquées forment un préfixe de la table
+    return classes.sort_values('k', kind='stable').reset_index(drop=True)
+
+def class_summary(classes, threshold=5):
+    """Statistiques par personne calculées depuis la table des classes"""
+    
+    k = classes['k']
+    n_rows = int(k.sum())
+    if n_rows == 0:
+        return {'n_rows': 0, 'k_mean': 0.0, 'k_min': 0, 'high_risk_rows': 0, 'risk_score': 0}
+    
+    # une classe de taille k compte pour k personnes ayant chacune k-anonymat = k
+    high_risk_rows = int(k[k < threshold].sum())
+    k_mean = float((k * k).sum() / n_rows)
+    
+    return {
+        'n_rows': n_rows,
+        'k_mean': k_mean,
+        'k_min': int(k.min()),
+        'high_risk_rows': high_risk_rows,
+        'risk_score': _risk_score(high_risk_rows / n_rows * 100, k_mean),
+    }
+
+def k_distribution(classes, max_k=50):
+    """Nombre de personnes par valeur de k (k plafonné à max_k)"""
+    
+    k = classes['k']
+    return k.groupby(k.clip(upper=max_k)).sum().rename('nb_personnes')
+
+def risky_classes(classes, threshold=5, offset=0, limit=15):
+    """Page de classes risquées (k < threshold), servie depuis la table triée"""
+    
+    end = int(classes['k'].searchsorted(threshold, side='left'))
+    return classes.iloc[min(offset, end):min(offset + limit, end)], end
+
 def calculate_risk_score(k_series):
     """Calcule un score de risque global basé sur la distribution de k"""
     
@@ -62,6 +153,141 @@ def calculate_risk_score(k_series):
     # k moyen
     k_mean = k_series.mean()
     
+    return _risk_score(high_risk_pct, k_mean)
+
+def estimate_risk(df, quasi_identifiers, sample_size=APPROX_SAMPLE_SIZE, threshold=5,
+                  confidence=0.95, n_groups=APPROX_JACKKNIFE_GROUPS, prepare=None, seed=None):
+    """
+    Estime le risque à partir d'un échantillon aléatoire de lignes (mode approximatif).
+    
+    - part des lignes avec k < threshold et taux d'unicité dans la population :
+      modèle de mélange de Poisson (bayésien empirique, prior non paramétrique
+      estimé par EM sur les fréquences de l'échantillon)
+    - k moyen : estimateur sans biais de Σ F² (moments de la loi binomiale)
+    - intervalles de confiance : jackknife par groupes aléatoires (delete-a-group)
+    
+    prepare(sample) permet de dériver les QI (année, département) sur l'échantillon seulement.
+    """
+    
+    N = len(df)
+    rng = np.random.default_rng(seed)
+    
+    if sample_size < N:
+        rows = np.sort(rng.choice(N, size=sample_size, replace=False))
+        sample = df.iloc[rows]
+    else:
+        sample = df
+    if prepare is not None:
+        sample = prepare(sample)
+    
+    n = len(sample)
+    pi = n / N if N else 1.0
+    
+    if quasi_identifiers:
+        codes = sample.groupby(quasi_identifiers, dropna=False, observed=True).ngroup().to_numpy()
+    else:
+        codes = np.zeros(n, dtype=np.int64)
+    n_classes = int(codes.max()) + 1 if n else 0
+    
+    f = np.bincount(codes, minlength=n_classes)
+    point = _sample_risk_stats(f, pi, threshold)
+    
+    if pi < 1 and n_groups > 1 and n >= n_groups:
+        # fréquences par (classe, groupe) : chaque réplique retire un groupe de l'échantillon
+        groups = rng.integers(0, n_groups, size=n)
+        f_groups = np.bincount(codes * n_groups + groups, minlength=n_classes * n_groups).reshape(n_classes, n_groups)
+        replicates = np.array([
+            _sample_risk_stats(f - f_groups[:, g], pi * (n - f_groups[:, g].sum()) / n, threshold)
+            for g in range(n_groups)
+        ])
+        se = np.sqrt((n_groups - 1) / n_groups * ((replicates - replicates.mean(axis=0)) ** 2).sum(axis=0))
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        low = np.maximum(point - z * se, [0.0, 1.0, 0.0])
+        high = np.minimum(point + z * se, [1.0, np.inf, 1.0])
+    else:
+        low = high = point
+    
+    high_risk_share, k_mean, uniqueness_rate = (float(x) for x in point)
+    return {
+        'approximate': pi < 1,
+        'n_rows': N,
+        'sample_size': n,
+        'sampling_fraction': pi,
+        'high_risk_share': high_risk_share,
+        'high_risk_share_ci': (float(low[0]), float(high[0])),
+        'high_risk_rows': int(round(high_risk_share * N)),
+        'k_mean': k_mean,
+        'k_mean_ci': (float(low[1]), float(high[1])),
+        'uniqueness_rate': uniqueness_rate,
+        'uniqueness_rate_ci': (float(low[2]), float(high[2])),
+        'risk_score': _risk_score(high_risk_share * 100, k_mean) if n else 0,
+    }
+
+def _sample_risk_stats(freq, pi, threshold):
+    """(part k < threshold, k moyen, taux d'unicité) estimés depuis les fréquences de l'échantillon"""
+    
+    freq = freq[freq > 0]
+    n = freq.sum()
+    if n == 0:
+        return np.array([0.0, 0.0, 0.0])
+    
+    # k moyen par personne = Σ F² / N, avec E[f² - f(1-π)] = π² F²
+    freq_f = freq.astype(np.float64)
+    k_mean = max(1.0, (freq_f ** 2 - freq_f * (1 - pi)).sum() / (pi * n))
+    
+    if pi >= 1:
+        return np.array([freq[freq < threshold].sum() / n, k_mean, (freq == 1).sum() / n])
+    
+    values, counts = np.unique(freq, return_counts=True)
+    lam, posterior = _fit_poisson_mixture(values, counts, pi)
+    
+    # F - f | λ ~ Poisson((1-π) λ) : probabilité que la classe reste sous le seuil
+    rest = (1 - pi) * lam
+    high_risk_rows = 0.0
+    for i, v in enumerate(values[values < threshold]):
+        m = np.arange(threshold - v)
+        p_rest = np.exp(np.outer(m, np.log(rest)) - rest - _log_factorial(m)[:, None]).sum(axis=0)
+        high_risk_rows += v * counts[i] * (posterior[i] * p_rest).sum()
+    
+    # P(F = 1 | f = 1) = E[exp(-(1-π) λ) | f = 1]
+    uniques = 0.0
+    if values[0] == 1:
+        uniques = counts[0] * (posterior[0] * np.exp(-rest)).sum()
+    
+    return np.array([high_risk_rows / n, k_mean, uniques / n])
+
+def _fit_poisson_mixture(values, counts, pi, n_points=150, max_iter=3000, tol=1e-9):
+    """
+    Estime par EM la loi des tailles de classes (mélange de Poisson sur une grille de λ)
+    à partir des fréquences observées f ~ Poisson(π λ) tronquée en 0.
+    Retourne la grille λ et la loi a posteriori de λ pour chaque valeur de f.
+    """
+    
+    lam = np.logspace(-2, np.log10(max(values.max() / pi * 4, 10)), n_points)
+    mu = pi * lam
+    log_lik = (np.outer(values, np.log(mu)) - mu - _log_factorial(values)[:, None]
+               - np.log(-np.expm1(-mu)))
+    lik = np.exp(log_lik - log_lik.max(axis=1, keepdims=True))
+    
+    weights = np.full(n_points, 1 / n_points)
+    for _ in range(max_iter):
+        posterior = lik * weights
+        posterior /= posterior.sum(axis=1, keepdims=True)
+        new_weights = posterior.T @ counts
+        new_weights /= new_weights.sum()
+        converged = np.abs(new_weights - weights).max() < tol
+        weights = new_weights
+        if converged:
+            break
+    
+    posterior = lik * weights
+    posterior /= posterior.sum(axis=1, keepdims=True)
+    return lam, posterior
+
+def _log_factorial(values):
+    return np.array([lgamma(v + 1) for v in values])
+
+def _risk_score(high_risk_pct, k_mean):
     # score de risque sur 100 (plus c'est élevé, plus c'est risqué)
     if k_mean < 5:
         risk_score = 90 + high_risk_pct / 10
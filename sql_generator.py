@@ -1,3 +1,4 @@
+import re
 from datetime import datetime
 
 def generate_sql_anonymization_script(applied_rules):
@@ -80,6 +81,29 @@ def generate_sql_anonymization_script(applied_rules):
         script += "    END;\n\n"
         script += "ALTER TABLE assures DROP COLUMN montant_pension_mensuelle;\n\n"
     
+    # Montants → Microagrégation (approximation par tri : MDAV n'est pas exprimable en SQL)
+    micro_rules = [rule for rule in applied_rules if "Microagrégation" in rule]
+    if micro_rules:
+        k = int(re.search(r"k=(\d+)", micro_rules[0]).group(1))
+        script += f"-- Microagrégation des montants (groupes de {k} assurés consécutifs dans l'ordre de chaque montant)\n"
+        script += "-- NB: l'application utilise MDAV multivarié, le script en est une approximation par tri, colonne par colonne\n"
+        script += f"-- Un montant présent chez moins de {k} assurés ne peut pas être agrégé : il est mis à NULL\n"
+        script += "ALTER TABLE assures ALTER COLUMN revenu_annuel_brut TYPE NUMERIC(12, 2),\n"
+        script += "    ALTER COLUMN montant_pension_mensuelle TYPE NUMERIC(12, 2);\n"
+        for column in ("revenu_annuel_brut", "montant_pension_mensuelle"):
+            # colonne par colonne sur les valeurs présentes ; moins de k valeurs : pas de groupe possible, on masque
+            script += "WITH groupes AS (\n"
+            script += f"    SELECT id_assure, {column} AS valeur, COUNT(*) OVER () AS n,\n"
+            script += f"           LEAST((ROW_NUMBER() OVER (ORDER BY {column}) - 1) / {k}, GREATEST(COUNT(*) OVER () / {k} - 1, 0)) AS groupe\n"
+            script += "    FROM assures\n"
+            script += f"    WHERE {column} IS NOT NULL\n"
+            script += "), centroides AS (\n"
+            script += f"    SELECT id_assure, CASE WHEN n >= {k} THEN ROUND(AVG(valeur) OVER (PARTITION BY groupe), 2) END AS valeur\n"
+            script += "    FROM groupes\n"
+            script += ")\n"
+            script += f"UPDATE assures SET {column} = c.valeur\n"
+            script += "FROM centroides c WHERE assures.id_assure = c.id_assure;\n\n"
+    
     script += "-- FIN DU SCRIPT\n"
     script += "-- Vérifier les résultats avant de faire:\n"
     script += "COMMIT;\n"
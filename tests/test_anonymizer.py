@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+from anonymizer import MICROAGG_COLUMNS, microaggregate
+
+
+def _amounts(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    revenu = rng.integers(15000, 150000, n_rows).astype(float)
+    return pd.DataFrame({
+        'revenu_annuel_brut': revenu,
+        'montant_pension_mensuelle': np.round(revenu * rng.uniform(0.4, 0.7, n_rows) / 12),
+    })
+
+
+def _assert_k_anonymous(result, k):
+    # chaque montant publié est partagé par au moins k lignes
+    for col in MICROAGG_COLUMNS:
+        counts = result[col].dropna().value_counts()
+        assert (counts >= k).all(), counts[counts < k]
+
+
+def test_microaggregate_masks_small_incomplete_groups():
+    df = _amounts(200)
+    # moins de k lignes sans pension, moins de k lignes sans revenu
+    df.loc[[3, 50], 'montant_pension_mensuelle'] = np.nan
+    df.loc[[7], 'revenu_annuel_brut'] = np.nan
+    result = microaggregate(df, k=5)
+
+    _assert_k_anonymous(result, 5)
+    assert result.loc[[3, 50], 'revenu_annuel_brut'].isna().all()
+    assert np.isnan(result.loc[7, 'montant_pension_mensuelle'])
+
+
+def test_microaggregate_groups_incomplete_rows_when_enough():
+    df = _amounts(300, seed=1)
+    df.loc[range(0, 60, 3), 'montant_pension_mensuelle'] = np.nan
+    df.loc[range(61, 100, 4), 'revenu_annuel_brut'] = np.nan
+    result = microaggregate(df, k=5)
+
+    _assert_k_anonymous(result, 5)
+    # les valeurs présentes des lignes incomplètes sont agrégées, pas masquées
+    assert result.loc[range(0, 60, 3), 'revenu_annuel_brut'].notna().all()
+    assert result['revenu_annuel_brut'].isna().sum() == df['revenu_annuel_brut'].isna().sum()
+
+
+def test_microaggregate_masks_dataset_smaller_than_k():
+    result = microaggregate(_amounts(3), k=5)
+    assert result[MICROAGG_COLUMNS].isna().all().all()
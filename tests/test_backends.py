@@ -0,0 +1,81 @@
+import io
+
+import numpy as np
+import pytest
+from pandas.testing import assert_frame_equal
+
+from anonymizer import anonymize_data
+from csv_loader import read_csv
+from data_generator import generate_demo_data
+from rgpd_analyzer import equivalence_classes
+
+pytest.importorskip("polars")
+
+RULES = {
+    'hash_identifiants': True, 'supprimer_noms': True,
+    'tranches_age': True, 'postal_to_dept': True,
+    'supprimer_commune': True, 'tranches_revenus': True
+}
+
+
+def _with_holes(df, seed=0):
+    # valeurs manquantes sur les colonnes transformées, index décalé
+    rng = np.random.default_rng(seed)
+    df = df.copy()
+    for col in ['date_naissance', 'code_postal', 'revenu_annuel_brut', 'montant_pension_mensuelle', 'sexe', 'id_assure']:
+        df.loc[rng.random(len(df)) < 0.05, col] = np.nan
+    df.index = df.index + 1000
+    return df
+
+
+def _from_csv(df):
+    # mêmes données, typées par le chargeur CSV de l'application
+    typed, _ = read_csv(io.BytesIO(df.to_csv(index=False).encode()))
+    return typed
+
+
+@pytest.fixture(scope="module", params=['demo', 'csv', 'holes', 'csv_holes'])
+def dataset(request):
+    df = generate_demo_data(2000)
+    if 'holes' in request.param:
+        df = _with_holes(df)
+    if 'csv' in request.param:
+        df = _from_csv(df)
+    return df
+
+
+@pytest.mark.parametrize("rules", [
+    RULES,
+    {**RULES, 'microagregation': 5},
+    {**RULES, 'hash_identifiants': False, 'postal_to_dept': False, 'tranches_age': False},
+])
+def test_anonymize_polars_matches_pandas(dataset, rules):
+    expected, expected_rules = anonymize_data(dataset, rules)
+    result, applied_rules = anonymize_data(dataset, rules, backend='polars')
+
+    assert applied_rules == expected_rules
+    assert_frame_equal(result, expected)
+
+
+@pytest.mark.parametrize("quasi_identifiers", [
+    ['annee_naissance', 'departement', 'sexe'],
+    ['date_naissance', 'code_postal'],
+    ['sexe', 'statut', 'type_regime'],
+])
+def test_equivalence_classes_polars_matches_pandas(dataset, quasi_identifiers):
+    expected = equivalence_classes(dataset, quasi_identifiers, derive=True)
+    result = equivalence_classes(dataset, quasi_identifiers, derive=True, backend='polars')
+
+    assert_frame_equal(result, expected)
+
+
+@pytest.mark.parametrize("quasi_identifiers", [
+    ['tranche_age', 'departement', 'sexe'],
+    ['tranche_revenu', 'tranche_pension', 'statut'],
+])
+def test_equivalence_classes_polars_matches_pandas_on_anonymized(dataset, quasi_identifiers):
+    df_anon, _ = anonymize_data(dataset, RULES)
+    expected = equivalence_classes(df_anon, quasi_identifiers, derive=True)
+    result = equivalence_classes(df_anon, quasi_identifiers, derive=True, backend='polars')
+
+    assert_frame_equal(result, expected)
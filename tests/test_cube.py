@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from cube import CUBE_DIMENSIONS, _marginal_lines, build_cube
+
+
+def _dataset(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'tranche_age': rng.choice(['60-70 ans', '70-80 ans', '80+ ans'], n_rows, p=[0.6, 0.35, 0.05]),
+        'departement': rng.choice(['75', '69', '59', '44', '2A'], n_rows, p=[0.4, 0.3, 0.2, 0.09, 0.01]),
+        'sexe': rng.choice(['M', 'F'], n_rows),
+        'secteur_activite': rng.choice(['Public', 'Privé', 'Agricole'], n_rows, p=[0.3, 0.65, 0.05]),
+        'montant_pension_mensuelle': rng.uniform(800, 3500, n_rows).round(2),
+    })
+
+
+def test_cube_masks_small_cells():
+    cube = build_cube(_dataset(500), k=5)
+    visible = cube[~cube['masque']]
+    assert (visible['effectif'] >= 5).all()
+    assert cube.loc[cube['masque'], ['effectif', 'pension_moyenne']].isna().all().all()
+
+
+def test_cube_masked_cells_cannot_be_derived_from_margins():
+    cube = build_cube(_dataset(500), k=5)
+    dims = [d for d in CUBE_DIMENSIONS if d in cube.columns]
+    masked = cube['masque'].to_numpy()
+    counts = cube['effectif'].to_numpy(dtype=float, na_value=np.nan)
+    raw_counts = build_cube(_dataset(500), k=1)['effectif'].to_numpy(dtype=np.int64)
+
+    for children, parents in _marginal_lines(cube, dims):
+        for parent in np.unique(parents):
+            kids = children[parents == parent]
+            # équation parente = somme des filles : jamais une seule inconnue
+            assert masked[kids].sum() + masked[parent] != 1
+            if not masked[parent] and masked[kids].any():
+                assert raw_counts[kids][masked[kids]].sum() >= 5
+    assert np.isnan(counts[masked]).all()
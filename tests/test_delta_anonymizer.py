@@ -0,0 +1,55 @@
+import os
+import sys
+import threading
+
+from pandas.testing import assert_frame_equal
+
+from anonymizer import anonymize_data
+from delta_anonymizer import _load_state, anonymize_delta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from bench_parallel_anonymize import RULES, synthetic_dataset  # noqa: E402
+
+
+def test_delta_runs_match_full_run(tmp_path):
+    df = synthetic_dataset(300)
+    state_dir = str(tmp_path)
+
+    first, _, stats = anonymize_delta(df, RULES, state_dir=state_dir)
+    assert not stats['incremental']
+    assert_frame_equal(first, anonymize_data(df, RULES)[0])
+
+    # tout est repris du run précédent
+    reused, _, stats = anonymize_delta(df, RULES, state_dir=state_dir)
+    assert stats['reused'] == len(df)
+    assert_frame_equal(reused, anonymize_data(df, RULES)[0])
+
+    # quelques lignes modifiées
+    changed = df.copy()
+    changed.loc[changed.index[:10], 'code_postal'] = "75001"
+    partial, _, stats = anonymize_delta(changed, RULES, state_dir=state_dir)
+    assert stats['processed'] == 10
+    assert_frame_equal(partial, anonymize_data(changed, RULES)[0])
+
+
+def test_concurrent_runs_keep_a_valid_state(tmp_path):
+    state_dir = str(tmp_path)
+    frames = [synthetic_dataset(200, seed=seed) for seed in range(4)]
+    errors = []
+
+    def run(df):
+        try:
+            anonymize_delta(df, RULES, state_dir=state_dir)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(df,)) for df in frames]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    state = _load_state(os.path.join(state_dir, "state.pkl"))
+    assert len(state['output']) == 200
+    assert not [name for name in os.listdir(state_dir) if name.endswith(".tmp")]
@@ -0,0 +1,75 @@
+import contextvars
+import threading
+import time
+
+import numpy as np
+
+import instrumentation
+
+
+def _run_isolated(func):
+    # chaque session Streamlit s'exécute dans son propre contexte
+    return contextvars.copy_context().run(func)
+
+
+def test_enabling_is_scoped_to_the_context():
+    instrumentation.reset()
+
+    def session_a():
+        instrumentation.set_enabled(True)
+        with instrumentation.span("etape_a"):
+            pass
+        return instrumentation.is_enabled()
+
+    def session_b():
+        with instrumentation.span("etape_b"):
+            pass
+        return instrumentation.is_enabled()
+
+    assert _run_isolated(session_a) is True
+    assert _run_isolated(session_b) is instrumentation.DEFAULT_ENABLED
+    names = {s['name'] for s in instrumentation.get_spans()}
+    assert "etape_a" in names
+    assert ("etape_b" in names) == instrumentation.DEFAULT_ENABLED
+
+
+def test_span_measures_its_own_memory_growth():
+    instrumentation.reset()
+
+    def session():
+        instrumentation.set_enabled(True)
+        with instrumentation.span("grosse"):
+            block = np.ones(64 * 1024 * 1024 // 8)
+            # laissé le temps d'au moins un échantillon
+            time.sleep(4 * instrumentation.RSS_SAMPLE_INTERVAL_S)
+            del block
+        with instrumentation.span("petite"):
+            pass
+
+    _run_isolated(session)
+    spans = {s['name']: s for s in instrumentation.get_spans()}
+    if spans['grosse']['rss_delta_bytes'] is None:
+        return  # mémoire résidente non mesurable sur cette plateforme
+    assert spans['grosse']['rss_delta_bytes'] >= 32 * 1024 * 1024
+    # le pic de l'étape précédente n'est pas attribué à la suivante
+    assert spans['petite']['rss_delta_bytes'] < 16 * 1024 * 1024
+
+
+def test_context_is_propagated_to_jobs(tmp_path):
+    from job_runner import JobRunner
+
+    runner = JobRunner(jobs_dir=str(tmp_path), max_workers=1)
+    seen = []
+    done = threading.Event()
+
+    def job(ctx):
+        seen.append(instrumentation.is_enabled())
+        done.set()
+
+    def session():
+        instrumentation.set_enabled(True)
+        runner.submit('test', job)
+
+    _run_isolated(session)
+    assert done.wait(10)
+    assert seen == [True]
@@ -0,0 +1,45 @@
+import os
+import time
+
+from job_runner import DONE, EXPIRED, FAILED, FINAL_STATUSES, JobRunner
+
+
+def _wait(runner, job_id, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = runner.get(job_id)
+        if job['status'] in FINAL_STATUSES:
+            return job
+        time.sleep(0.05)
+    raise TimeoutError(job_id)
+
+
+def _fail(ctx):
+    ctx.log("chargement...")
+    raise RuntimeError("connexion refusée")
+
+
+def test_failure_is_recorded(tmp_path):
+    runner = JobRunner(jobs_dir=str(tmp_path), max_workers=1)
+    job = _wait(runner, runner.submit('test', _fail))
+
+    assert job['status'] == FAILED
+    assert job['error'] == "connexion refusée"
+    assert runner.result(job['id']) is None
+
+
+def test_old_results_are_purged(tmp_path):
+    runner = JobRunner(jobs_dir=str(tmp_path), max_workers=1, result_ttl=3600)
+    job_id = runner.submit('test', lambda ctx: 42)
+    assert _wait(runner, job_id)['status'] == DONE
+    assert runner.result(job_id) == 42
+
+    # résultat vieux de deux heures
+    path = runner._result_path(job_id)
+    old = time.time() - 7200
+    os.utime(path, (old, old))
+    runner.purge_results()
+
+    assert not os.path.exists(path)
+    assert runner.get(job_id)['status'] == EXPIRED
+    assert runner.result(job_id) is None
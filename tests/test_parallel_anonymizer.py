@@ -0,0 +1,70 @@
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+import parallel_anonymizer
+from anonymizer import anonymize_data
+from parallel_anonymizer import anonymize_data_parallel
+
+RULES = {
+    'hash_identifiants': True, 'supprimer_noms': True,
+    'tranches_age': True, 'postal_to_dept': True,
+    'supprimer_commune': True, 'tranches_revenus': True
+}
+
+
+def make_dataset(n_rows=400):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'id_assure': np.arange(1, n_rows + 1),
+        'date_naissance': (np.datetime64('1940-01-01') + rng.integers(0, 365 * 30, n_rows).astype('timedelta64[D]')).astype(str),
+        'sexe': rng.choice(['M', 'F'], n_rows),
+        'code_postal': rng.integers(1000, 96000, n_rows),
+        'revenu_annuel_brut': rng.integers(15000, 150000, n_rows),
+        'montant_pension_mensuelle': rng.integers(600, 4000, n_rows),
+    })
+
+
+def shared_segments():
+    return {name for name in os.listdir('/dev/shm') if name.startswith('psm_')}
+
+
+def test_parallel_matches_serial_with_integer_ids():
+    df = make_dataset()
+
+    expected, expected_rules = anonymize_data(df, RULES)
+    result, applied_rules = anonymize_data_parallel(df, RULES, n_workers=2, n_partitions=4, min_rows=0)
+
+    assert applied_rules == expected_rules
+    assert_frame_equal(result, expected)
+
+
+@pytest.mark.skipif(not os.path.isdir('/dev/shm'), reason="segments de mémoire partagée non listables")
+def test_failed_read_releases_all_segments(monkeypatch):
+    df = make_dataset()
+    before = shared_segments()
+
+    def failing_read(name, size, unlink=False):
+        raise RuntimeError("lecture impossible")
+
+    monkeypatch.setattr(parallel_anonymizer, '_read_frame', failing_read)
+    with pytest.raises(RuntimeError):
+        anonymize_data_parallel(df, RULES, n_workers=2, n_partitions=4, min_rows=0)
+
+    assert shared_segments() <= before
+
+
+def test_broken_pool_is_recreated():
+    df = make_dataset()
+    with pytest.raises(BrokenProcessPool):
+        parallel_anonymizer._get_pool().submit(os._exit, 1).result()
+
+    with pytest.raises(BrokenProcessPool):
+        anonymize_data_parallel(df, RULES, n_workers=2, n_partitions=4, min_rows=0)
+
+    result, _ = anonymize_data_parallel(df, RULES, n_workers=2, n_partitions=4, min_rows=0)
+    assert_frame_equal(result, anonymize_data(df, RULES)[0])
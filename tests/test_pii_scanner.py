@@ -0,0 +1,16 @@
+import pandas as pd
+
+from pii_scanner import PiiScanner
+
+
+def test_report_masks_detected_values():
+    df = pd.DataFrame({
+        'commentaire': ["RAS", "voir Dupontel", "contact jean.dupontel@example.fr", "RAS"],
+    })
+    report = PiiScanner({'nom': {"Dupontel"}}).scan(df, n_workers=1)
+
+    assert set(report['type']) == {'nom', 'email'}
+    assert report['lignes'].sum() == 3
+    for example in report['exemples']:
+        assert "dupontel" not in example.lower()
+        assert example.endswith("…")
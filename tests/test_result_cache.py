@@ -0,0 +1,46 @@
+import os
+
+import pandas as pd
+
+import result_cache
+import rgpd_analyzer
+from result_cache import ResultCache
+
+
+def test_put_failure_is_not_propagated(tmp_path):
+    cache = ResultCache(cache_dir=str(tmp_path))
+    # colonne de types mélangés : non sérialisable en Parquet
+    unserializable = pd.DataFrame({'valeur': [1, "a", 2.5]}, dtype=object)
+
+    cache.put("cle", unserializable)
+
+    assert cache.get("cle") == (False, None)
+    assert os.listdir(tmp_path) == []
+
+
+def test_put_then_get(tmp_path):
+    cache = ResultCache(cache_dir=str(tmp_path))
+    df = pd.DataFrame({'k': [1, 2, 3]})
+    cache.put("cle", (df, ["règle"]))
+
+    hit, (cached, rules) = cache.get("cle")
+    assert hit
+    pd.testing.assert_frame_equal(cached, df)
+    assert rules == ["règle"]
+
+
+def test_code_version_covers_imported_modules():
+    # equivalence_classes délègue au moteur Polars (backends.py), qui s'appuie sur anonymizer.py
+    files = {os.path.basename(p) for p in result_cache._local_dependencies(rgpd_analyzer.__file__)}
+    assert {'rgpd_analyzer.py', 'backends.py', 'anonymizer.py'} <= files
+
+
+def test_call_key_addresses_cached_call_entry(tmp_path):
+    cache = ResultCache(cache_dir=str(tmp_path))
+    df = pd.DataFrame({'k': [1, 2, 2]})
+
+    result = cache.cached_call(pd.DataFrame.drop_duplicates, df, 'k', dataset_key="jeu", key_params={'jour': 1})
+
+    hit, cached = cache.get(cache.call_key(pd.DataFrame.drop_duplicates, "jeu", 'k', key_params={'jour': 1}))
+    assert hit
+    pd.testing.assert_frame_equal(cached, result)